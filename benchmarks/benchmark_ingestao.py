@@ -0,0 +1,100 @@
+"""
+Benchmark da leitura das abas de disponibilidade.
+
+Compara o caminho original (upload gravado em arquivo temporário e um
+`pd.read_excel` por equipe, que reabre o .xlsx a cada aba) com
+`ingestao.ler_disponibilidade`, que lê todas as abas dos bytes em uma única
+passada. Mede a latência e o pico de memória alocada pelo Python (tracemalloc)
+em workbooks sintéticos com 20 ou mais abas.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_ingestao [--abas 20 40] [--linhas 500]
+"""
+import argparse
+import datetime
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+
+from ingestao import ler_disponibilidade
+
+
+def gerar_workbook(n_abas, linhas_por_aba, seed=0):
+    """Workbook no formato esperado: título na linha 1, cabeçalho na linha 2 e duas tabelas lado a lado."""
+    rnd = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    base = datetime.datetime(2024, 1, 1)
+    for a in range(n_abas):
+        planilha = workbook.create_sheet(f"Equipe{a + 1}")
+        planilha.append([f"Disponibilidade da equipe {a + 1}"])
+        planilha.append(["Data", "Turma", "hora ini", "hora fim", None, "Nome", "Turma", "Observação"])
+        turmas = [f"T{a}_{t}" for t in range(10)]
+        for i in range(linhas_por_aba):
+            inicio = rnd.choice([7, 8, 9, 13, 14])
+            linha = [base + datetime.timedelta(days=rnd.randrange(120)), rnd.choice(turmas),
+                     datetime.time(inicio), datetime.time(inicio + rnd.choice([2, 3, 4])), None]
+            linha += [f"Pessoa {a}-{i}", rnd.choice(turmas), "texto livre " * 3] if i < linhas_por_aba // 5 else [None, None, None]
+            planilha.append(linha)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def leitura_original(conteudo, equipes):
+    """Caminho anterior: arquivo temporário e um `pd.read_excel` por aba."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as temp_file:
+        temp_file.write(conteudo)
+        caminho = temp_file.name
+    try:
+        abas = {}
+        for equip in equipes:
+            df_equipe = pd.read_excel(caminho, sheet_name=equip, skiprows=1)
+            dfdisp = df_equipe[["Data", "Turma", "hora ini", "hora fim"]].dropna(subset=["Data"])
+            dfresp = df_equipe[["Nome", "Turma.1"]].rename(columns={"Turma.1": 'Turma'}).dropna(subset=['Nome'])
+            abas[equip] = pd.merge(dfdisp, dfresp, on='Turma', how='inner')[['Data', 'hora ini', 'hora fim', 'Nome', 'Turma']]
+        return abas
+    finally:
+        os.unlink(caminho)
+
+
+def medir(funcao, *args):
+    """Latência (sem tracemalloc, que distorce o tempo) e pico de memória em uma segunda execução."""
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    tempo = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    funcao(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tempo, pico / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--abas', type=int, nargs='+', default=[20, 40])
+    parser.add_argument('--linhas', type=int, default=500, help="linhas por aba")
+    args = parser.parse_args()
+
+    print(f"{'abas':>5} {'tamanho':>9}  {'original':>9} {'pico':>9}  {'passada única':>13} {'pico':>9}  {'speedup':>7}")
+    for n_abas in args.abas:
+        conteudo = gerar_workbook(n_abas, args.linhas)
+        equipes = [f"Equipe{a + 1}" for a in range(n_abas)]
+
+        original, tempo_original, pico_original = medir(leitura_original, conteudo, equipes)
+        novo, tempo_novo, pico_novo = medir(ler_disponibilidade, conteudo, equipes)
+        for equip in equipes:
+            pd.testing.assert_frame_equal(original[equip].reset_index(drop=True), novo[equip].reset_index(drop=True))
+
+        print(f"{n_abas:>5} {len(conteudo) / 1024:>7.0f}KB  {tempo_original:>8.2f}s {pico_original:>7.1f}MB  "
+              f"{tempo_novo:>12.2f}s {pico_novo:>7.1f}MB  {tempo_original / tempo_novo:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
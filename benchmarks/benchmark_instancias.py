@@ -0,0 +1,75 @@
+"""
+Reprodução de instâncias capturadas (ver `instancias.py`).
+
+Resolve cada instância .npz de um diretório (gravadas com
+CRONOGRAMA_DIRETORIO_CAPTURA ou `instancias.exportar_instancia`) com os parâmetros
+da captura e registra o tempo de carga, o tempo do solver, o tempo total, o
+objetivo (sessões + penalidade x não alocados) e o gap ao fim. Os parâmetros
+informados na linha de comando substituem os da captura.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_instancias <diretório> [--solver cbc|highs] [--tempo-limite 120]
+        [--modo otimo|heuristico|hierarquico] [--sem-mmap]
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import instancias
+from instancias import carregar_instancia, listar_instancias
+from otimizador import MODOS, otimizar_cronograma
+from solvers import SOLVERS, configurar_solver
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('diretorio')
+    parser.add_argument('--solver', choices=SOLVERS, help="backend no lugar do capturado")
+    parser.add_argument('--tempo-limite', type=float, help="segundos para a otimização inteira, no lugar do capturado")
+    parser.add_argument('--modo', choices=MODOS, help="modo no lugar do capturado")
+    parser.add_argument('--sem-mmap', action='store_true', help="copia os arrays para a memória em vez de mapeá-los")
+    args = parser.parse_args()
+    if not os.path.isdir(args.diretorio):
+        parser.error(f"diretório não encontrado: '{args.diretorio}'")
+
+    # A reprodução não captura de novo (CRONOGRAMA_DIRETORIO_CAPTURA pode ser o próprio diretório)
+    instancias.DIRETORIO_CAPTURA = None
+    caminhos = listar_instancias(args.diretorio)
+    if not caminhos:
+        parser.error(f"nenhuma instância em '{args.diretorio}'")
+
+    print(f"{'instância':<28} {'sessões':>7} {'pessoas':>7} {'pares':>7} {'backend':>7}  "
+          f"{'carga':>7} {'solver':>8} {'total':>8} {'objetivo':>9} {'gap':>7}")
+    for caminho in caminhos:
+        inicio = time.perf_counter()
+        tabela, df_matriz, configuracao = carregar_instancia(caminho, mmap=not args.sem_mmap)
+        carga = time.perf_counter() - inicio
+
+        if args.solver:
+            configuracao["solver"] = configurar_solver(
+                args.solver, **{k: v for k, v in configuracao["solver"].items() if k != "nome"}
+            )
+        if args.tempo_limite is not None:
+            configuracao["tempo_limite_segundos"] = args.tempo_limite
+        if args.modo:
+            configuracao["modo"] = args.modo
+
+        inicio = time.perf_counter()
+        # Os avisos da otimização atrapalhariam a tabela
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = otimizar_cronograma(tabela, df_matriz, **configuracao)
+        total = time.perf_counter() - inicio
+
+        estatisticas = resultado["estatisticas_modelo"]
+        solver = estatisticas["solver"] or {}
+        objetivo = solver.get("objetivo", resultado["heuristica"]["objetivo"])
+        gap = f"{solver['gap_relativo']:.4f}" if solver.get("gap_relativo") is not None else "-"
+        print(f"{os.path.basename(caminho):<28} {df_matriz.shape[0]:>7} {df_matriz.shape[1]:>7} "
+              f"{estatisticas['pares_disponiveis']:>7} {configuracao['solver']['nome']:>7}  {carga * 1000:>5.0f}ms "
+              f"{estatisticas['tempo_solver_segundos']:>7.2f}s {total:>7.2f}s {objetivo:>9} {gap:>7}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
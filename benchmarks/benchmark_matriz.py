@@ -0,0 +1,119 @@
+"""
+Benchmark da construção da matriz de disponibilidade.
+
+Compara o laço original (sessão x pessoa x janela com `iterrows`) com
+`calcular_matriz_disponibilidade` em dados sintéticos nas escalas 10x, 100x e 1000x.
+A escala multiplica o número de células da matriz em relação à base
+(40 sessões x 60 pessoas). Quando o laço original demoraria demais, ele é medido
+em uma amostra de sessões e o tempo total é extrapolado (marcado com '~').
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_matriz
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from criar_matriz import calcular_matriz_disponibilidade
+
+SESSOES_BASE = 40
+PESSOAS_BASE = 60
+JANELAS_POR_PESSOA = 5
+ESCALAS = [10, 100, 1000]
+# Orçamento aproximado (segundos) para medir o laço original em cada escala
+ORCAMENTO_LEGADO = 10.0
+
+
+def gerar_dados(escala, seed=0):
+    """Gera sessões e janelas de disponibilidade sintéticas para a escala dada."""
+    rng = np.random.default_rng(seed)
+    fator = math.sqrt(escala)
+    n_sessoes = int(SESSOES_BASE * fator)
+    n_pessoas = int(PESSOAS_BASE * fator)
+    dias = max(1, n_sessoes // 4)
+    base = np.datetime64('2024-01-01T00:00', 'ns')
+    hora = np.timedelta64(1, 'h')
+
+    inicio_sessao = base + rng.integers(0, dias, n_sessoes) * 24 * hora + rng.choice([8, 9, 13, 14], n_sessoes) * hora
+    df_sessoes = pd.DataFrame({
+        'Sessao': [f"sessao_{i+1}" for i in range(n_sessoes)],
+        'Inicio_Sessao': inicio_sessao,
+        'Fim_Sessao': inicio_sessao + 2 * hora,
+    })
+
+    n_janelas = n_pessoas * JANELAS_POR_PESSOA
+    inicio_disp = base + rng.integers(0, dias, n_janelas) * 24 * hora + rng.integers(7, 15, n_janelas) * hora
+    df_disponibilidade = pd.DataFrame({
+        'Nome': [f"Pessoa {i}" for i in rng.integers(0, n_pessoas, n_janelas)],
+        'Inicio_Disp': inicio_disp,
+        'Fim_Disp': inicio_disp + rng.integers(2, 6, n_janelas) * hora,
+    })
+    return df_sessoes, df_disponibilidade
+
+
+def matriz_legado(df_sessoes, df_disponibilidade_bruta, limite_sessoes=None):
+    """Reprodução fiel do laço original de `criar_matriz` (antes da vetorização)."""
+    pessoas = df_disponibilidade_bruta['Nome'].unique()
+    sessoes = df_sessoes['Sessao'].unique()[:limite_sessoes]
+
+    df_matriz_disponibilidade = pd.DataFrame(0, index=sessoes, columns=pessoas)
+    for sessao_nome in sessoes:
+        sessao_info = df_sessoes.loc[df_sessoes['Sessao'] == sessao_nome].iloc[0]
+        inicio_sessao = sessao_info['Inicio_Sessao']
+        fim_sessao = sessao_info['Fim_Sessao']
+
+        for pessoa_nome in pessoas:
+            disponibilidade_pessoa = df_disponibilidade_bruta[df_disponibilidade_bruta['Nome'] == pessoa_nome]
+
+            disponivel = False
+            for _, disp_row in disponibilidade_pessoa.iterrows():
+                if disp_row['Inicio_Disp'] <= inicio_sessao and fim_sessao <= disp_row['Fim_Disp']:
+                    disponivel = True
+                    break
+
+            if disponivel:
+                df_matriz_disponibilidade.loc[sessao_nome, pessoa_nome] = 1
+
+    return df_matriz_disponibilidade
+
+
+def medir(escala):
+    df_sessoes, df_disponibilidade = gerar_dados(escala)
+    n_sessoes = len(df_sessoes)
+
+    inicio = time.perf_counter()
+    matriz = calcular_matriz_disponibilidade(df_sessoes, df_disponibilidade)
+    tempo_vetorizado = time.perf_counter() - inicio
+
+    # Calibra o laço original com uma sessão para decidir se cabe no orçamento
+    inicio = time.perf_counter()
+    matriz_legado(df_sessoes, df_disponibilidade, limite_sessoes=1)
+    tempo_por_sessao = time.perf_counter() - inicio
+    amostra = max(1, min(n_sessoes, int(ORCAMENTO_LEGADO / max(tempo_por_sessao, 1e-9))))
+
+    inicio = time.perf_counter()
+    referencia = matriz_legado(df_sessoes, df_disponibilidade, limite_sessoes=amostra)
+    tempo_legado = (time.perf_counter() - inicio) * n_sessoes / amostra
+
+    iguais = np.array_equal(matriz.iloc[:amostra].to_numpy(), referencia.to_numpy())
+    estimado = '~' if amostra < n_sessoes else ' '
+    print(f"{escala:>6}x  {n_sessoes:>6} x {matriz.shape[1]:<6} "
+          f"{estimado}{tempo_legado:>10.2f} s  {tempo_vetorizado:>9.4f} s  "
+          f"{tempo_legado / max(tempo_vetorizado, 1e-9):>9.0f}x  {'ok' if iguais else 'DIVERGENTE'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS)
+    args = parser.parse_args()
+
+    print(f"{'escala':>7}  {'sessões x pessoas':<17} {'laço original':>12}  {'vetorizado':>11}  {'speedup':>9}  matriz")
+    for escala in args.escalas:
+        medir(escala)
+
+
+if __name__ == '__main__':
+    main()
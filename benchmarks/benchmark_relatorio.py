@@ -0,0 +1,151 @@
+"""
+Benchmark do relatório Excel (/api/criar-relatorio-excel).
+
+Compara o caminho original (pandas ExcelWriter num BytesIO, com um DataFrame
+para o resumo e outro por sessão) com `relatorio.escrever_relatorio` (xlsxwriter
+em modo constant_memory num arquivo temporário, lido em pedaços como no envio).
+Cada medição roda num processo próprio para que o pico de RSS seja só dela.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_relatorio [--sessoes 100 500 2000] [--pessoas 20]
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from relatorio import escrever_relatorio_temporario, ler_em_partes
+
+
+def gerar_resultado(n_sessoes, pessoas_por_sessao, n_nao_alocados=200):
+    """Resultado sintético no formato devolvido pela otimização."""
+    base = datetime.date(2024, 1, 1)
+    sessoes = []
+    for i in range(n_sessoes):
+        integrantes = [f"Pessoa {i}-{j}" for j in range(pessoas_por_sessao)]
+        sessoes.append({
+            "nome_sessao": f"sessao_{i + 1}",
+            "data_evento": (base + datetime.timedelta(days=i // 4)).strftime('%Y-%m-%d'),
+            "hora_inicio": "08:00",
+            "hora_fim": "10:00",
+            "quantidade_pessoas": len(integrantes),
+            "integrantes": integrantes,
+        })
+    return {
+        "total_sessoes_utilizadas": n_sessoes,
+        "sessoes_agendadas": sessoes,
+        "pessoas_nao_alocadas": [f"Sem sessão {k}" for k in range(n_nao_alocados)],
+    }
+
+
+def relatorio_original(resultado):
+    """Caminho anterior do endpoint: workbook inteiro num BytesIO via pandas."""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        workbook = writer.book
+        title_format = workbook.add_format({'bold': True, 'font_size': 16, 'font_color': '#002D5B', 'valign': 'vcenter'})
+        header_format = workbook.add_format({'bold': True, 'fg_color': '#002D5B', 'font_color': 'white', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
+        bold_format = workbook.add_format({'bold': True})
+        alert_header_format = workbook.add_format({'bold': True, 'fg_color': '#FFC7CE', 'font_color': '#9C0006', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
+
+        df_resumo = pd.DataFrame([{
+            'Sessão': s["nome_sessao"],
+            'Data': pd.to_datetime(s["data_evento"]).strftime('%d/%m/%Y'),
+            'Horário': f"{s['hora_inicio']} - {s['hora_fim']}",
+            'Nº de Participantes': s["quantidade_pessoas"]
+        } for s in resultado["sessoes_agendadas"]])
+        df_resumo.to_excel(writer, sheet_name='Resumo_Geral', startrow=2, index=False)
+        resumo_sheet = writer.sheets['Resumo_Geral']
+        resumo_sheet.write('A1', 'Resumo do Cronograma Otimizado', title_format)
+        for col_num, value in enumerate(df_resumo.columns.values):
+            resumo_sheet.write(2, col_num, value, header_format)
+        for i, col in enumerate(df_resumo.columns):
+            resumo_sheet.set_column(i, i, max(df_resumo[col].astype(str).str.len().max(), len(col)) + 2)
+
+        if resultado["pessoas_nao_alocadas"]:
+            start_row = len(df_resumo) + 6
+            resumo_sheet.write(start_row, 0, 'Pessoas Não Alocadas', alert_header_format)
+            pd.DataFrame({'Nome': resultado["pessoas_nao_alocadas"]}).to_excel(
+                writer, sheet_name='Resumo_Geral', startrow=start_row + 1, index=False, header=False)
+            resumo_sheet.set_column(0, 0, 40)
+
+        for sessao in resultado["sessoes_agendadas"]:
+            sheet_name = sessao["nome_sessao"].replace(" ", "_").replace(":", "-")[:31]
+            pd.DataFrame({'Integrantes da Sessão': sorted(sessao["integrantes"])}).to_excel(
+                writer, sheet_name=sheet_name, startrow=5, index=False)
+            worksheet = writer.sheets[sheet_name]
+            worksheet.write('A1', f"Detalhes da {sessao['nome_sessao']}", title_format)
+            worksheet.write('A3', 'Data:', bold_format)
+            worksheet.write('B3', pd.to_datetime(sessao["data_evento"]).strftime('%d/%m/%Y'))
+            worksheet.write('A4', 'Horário:', bold_format)
+            worksheet.write('B4', f"{sessao['hora_inicio']} - {sessao['hora_fim']}")
+            worksheet.write('D3', 'Total de Participantes:', bold_format)
+            worksheet.write('E3', sessao["quantidade_pessoas"])
+            worksheet.write(5, 0, 'Integrantes da Sessão', header_format)
+            worksheet.set_column('A:A', 40)
+
+    output.seek(0)
+    return len(output.getvalue())
+
+
+def relatorio_streaming(resultado):
+    """Caminho novo, consumindo os pedaços como o StreamingResponse faria."""
+    caminho = escrever_relatorio_temporario(resultado)
+    return sum(len(parte) for parte in ler_em_partes(caminho))
+
+
+IMPLEMENTACOES = {"original": relatorio_original, "streaming": relatorio_streaming}
+
+
+def medir_no_processo(implementacao, n_sessoes, pessoas):
+    """Executa uma medição no processo atual e devolve latência, tamanho e picos de RSS (MB)."""
+    resultado = gerar_resultado(n_sessoes, pessoas)
+    rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    inicio = time.perf_counter()
+    tamanho = IMPLEMENTACOES[implementacao](resultado)
+    tempo = time.perf_counter() - inicio
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"tempo": tempo, "tamanho": tamanho, "rss_pico": rss_pico, "rss_extra": rss_pico - rss_antes}
+
+
+def medir(implementacao, n_sessoes, pessoas):
+    """Roda a medição num processo novo."""
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.benchmark_relatorio", "--medir", implementacao,
+         "--sessoes", str(n_sessoes), "--pessoas", str(pessoas)],
+        check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--pessoas', type=int, default=20, help="integrantes por sessão")
+    parser.add_argument('--medir', choices=sorted(IMPLEMENTACOES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir_no_processo(args.medir, args.sessoes[0], args.pessoas)))
+        return
+
+    print(f"{'sessões':>7} {'tamanho':>9}  {'original':>9} {'RSS pico':>9} {'RSS +':>8}  "
+          f"{'streaming':>9} {'RSS pico':>9} {'RSS +':>8}  {'speedup':>7}")
+    for n_sessoes in args.sessoes:
+        original = medir("original", n_sessoes, args.pessoas)
+        novo = medir("streaming", n_sessoes, args.pessoas)
+        print(f"{n_sessoes:>7} {novo['tamanho'] / 1024:>7.0f}KB  "
+              f"{original['tempo']:>8.2f}s {original['rss_pico']:>7.1f}MB {original['rss_extra']:>6.1f}MB  "
+              f"{novo['tempo']:>8.2f}s {novo['rss_pico']:>7.1f}MB {novo['rss_extra']:>6.1f}MB  "
+              f"{original['tempo'] / novo['tempo']:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark da geração de sessões.
+
+Compara o cruzamento original (merge com `key=1` e conversões de data e hora para
+texto) com `criar_sessoes` em intervalos de 1, 5 e 20 anos, todos os dias da
+semana e horários de hora em hora, e mede também a montagem da `TabelaSessoes`.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_sessoes [--anos 1 5 20] [--horarios 12]
+"""
+import argparse
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+from criar_sessoes import criar_sessoes, tabela_sessoes
+
+
+def sessoes_legado(data_inicio_str, data_fim_str, dias_da_semana, horarios_inicio_list, duracao_sessao_horas, capacidade_padrao):
+    """Reprodução fiel da versão original de `criar_sessoes` (sem o tratamento de erros)."""
+    df_datas = pd.DataFrame(pd.date_range(start=data_inicio_str, end=data_fim_str), columns=['Data do evento'])
+    df_datas['Dia_Semana'] = df_datas['Data do evento'].dt.dayofweek
+    df_datas_filtrado = df_datas[df_datas['Dia_Semana'].isin(dias_da_semana)].copy()
+
+    horarios_processados = []
+    for h in horarios_inicio_list:
+        hora_inicio = pd.to_datetime(h).time()
+        hora_fim = (pd.to_datetime(h) + timedelta(hours=duracao_sessao_horas)).time()
+        horarios_processados.append({'Hora ini': hora_inicio, 'Hora fim': hora_fim})
+    df_horarios = pd.DataFrame(horarios_processados)
+
+    df_datas_filtrado['key'] = 1
+    df_horarios['key'] = 1
+    df_sessoes = pd.merge(df_datas_filtrado, df_horarios, on='key').drop('key', axis=1)
+    df_sessoes['Sessao'] = [f"sessao_{i+1}" for i in range(len(df_sessoes))]
+    df_sessoes['Capacidade'] = capacidade_padrao
+    df_sessoes['Inicio_Sessao'] = pd.to_datetime(
+        df_sessoes['Data do evento'].astype(str) + ' ' + df_sessoes['Hora ini'].astype(str)
+    )
+    df_sessoes['Fim_Sessao'] = pd.to_datetime(
+        df_sessoes['Data do evento'].astype(str) + ' ' + df_sessoes['Hora fim'].astype(str)
+    )
+    colunas_finais = [
+        'Sessao', 'Data do evento', 'Dia_Semana', 'Hora ini', 'Hora fim',
+        'Inicio_Sessao', 'Fim_Sessao', 'Capacidade'
+    ]
+    return df_sessoes[colunas_finais]
+
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--anos', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--horarios', type=int, default=12, help="horários de início por dia")
+    args = parser.parse_args()
+
+    horarios = [f"{7 + h % 16:02d}:00" for h in range(args.horarios)]
+    print(f"{'anos':>4} {'sessões':>8}  {'original':>9} {'novo':>8} {'tabela':>8}  {'speedup':>7}")
+    for anos in args.anos:
+        parametros = ("2024-01-01", f"{2024 + anos - 1}-12-31", list(range(7)), horarios, 2, 10)
+        _, tempo_legado = medir(sessoes_legado, *parametros)
+        df_sessoes, tempo_novo = medir(criar_sessoes, *parametros)
+        _, tempo_tabela = medir(tabela_sessoes, df_sessoes)
+        print(f"{anos:>4} {len(df_sessoes):>8}  {tempo_legado * 1000:>7.0f}ms {tempo_novo * 1000:>6.0f}ms "
+              f"{tempo_tabela * 1000:>6.0f}ms  {tempo_legado / tempo_novo:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark dos backends de solver (ver `solvers.py`).
+
+Gera instâncias sintéticas pequena, média e grande (equipes com janelas de
+disponibilidade em semanas próprias, como no arquivo real) e resolve cada uma com
+CBC em uma thread, CBC com todas as threads e HiGHS. Registra o tempo do solver,
+o tempo total, o objetivo (sessões + penalidade x não alocados) e o gap ao fim.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_solvers [--instancias pequena media grande] [--tempo-limite 120] [--monolitico]
+        [--modo otimo|hierarquico]
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from criar_matriz import calcular_matriz_disponibilidade
+from criar_sessoes import criar_sessoes
+from otimizador import MODOS, otimizar_cronograma
+from solvers import configurar_solver
+
+# (equipes, pessoas por equipe)
+INSTANCIAS = {"pequena": (2, 40), "media": (4, 150), "grande": (8, 300)}
+JANELAS_POR_PESSOA = 4
+BACKENDS = {
+    "cbc-1": ("cbc", 1),
+    f"cbc-{os.cpu_count() or 1}": ("cbc", os.cpu_count() or 1),
+    "highs": ("highs", 0),
+}
+
+
+def gerar_instancia(equipes, pessoas_por_equipe, seed=0):
+    """Sessões de um semestre e matriz de disponibilidade sintética; cada equipe ocupa duas semanas."""
+    rng = np.random.default_rng(seed)
+    df_sessoes = criar_sessoes("2024-01-01", "2024-06-30", [0, 1, 2, 3, 4], ["08:00", "10:00", "14:00", "16:00"], 2, 12)
+    n_janelas = equipes * pessoas_por_equipe * JANELAS_POR_PESSOA
+    equipe = np.repeat(np.arange(equipes), pessoas_por_equipe * JANELAS_POR_PESSOA)
+    pessoa = np.repeat(np.arange(pessoas_por_equipe), JANELAS_POR_PESSOA)
+    base = np.datetime64('2024-01-01T00:00', 'ns')
+    hora = np.timedelta64(1, 'h')
+    dia = equipe * 21 + rng.integers(0, 14, n_janelas)
+    inicio_disp = base + dia * 24 * hora + rng.choice([8, 10, 14], n_janelas) * hora
+    df_disponibilidade = pd.DataFrame({
+        'Nome': [f"Pessoa {e}-{p}" for e, p in zip(equipe, np.tile(pessoa, equipes))],
+        'Inicio_Disp': inicio_disp,
+        'Fim_Disp': inicio_disp + rng.integers(2, 6, n_janelas) * hora,
+    })
+    return df_sessoes, calcular_matriz_disponibilidade(df_sessoes, df_disponibilidade)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--instancias', nargs='+', choices=list(INSTANCIAS), default=list(INSTANCIAS))
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--tempo-limite', type=float, default=120, help="segundos para a otimização inteira")
+    parser.add_argument('--monolitico', action='store_true', help="resolve sem decompor em componentes")
+    parser.add_argument('--modo', choices=[m for m in MODOS if m != "heuristico"], default="otimo")
+    args = parser.parse_args()
+
+    print(f"{'instância':>9} {'pares':>7} {'backend':>8}  {'solver':>8} {'total':>8} {'objetivo':>9} {'gap':>7} {'limite':>6}")
+    for nome_instancia in args.instancias:
+        df_sessoes, df_matriz = gerar_instancia(*INSTANCIAS[nome_instancia])
+        pares = int(df_matriz.to_numpy().sum())
+        for nome_backend in args.backends:
+            nome_solver, threads = BACKENDS[nome_backend]
+            inicio = time.perf_counter()
+            # Os avisos da otimização atrapalhariam a tabela
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultado = otimizar_cronograma(
+                    df_sessoes, df_matriz, tempo_limite_segundos=args.tempo_limite, decompor=not args.monolitico, modo=args.modo,
+                    solver=configurar_solver(nome_solver, threads=threads)
+                )
+            total = time.perf_counter() - inicio
+            estatisticas = resultado["estatisticas_modelo"]
+            solver = estatisticas["solver"]
+            gap = f"{solver['gap_relativo']:.4f}" if solver["gap_relativo"] is not None else "-"
+            print(f"{nome_instancia:>9} {pares:>7} {nome_backend:>8}  {estatisticas['tempo_solver_segundos']:>7.2f}s "
+                  f"{total:>7.2f}s {solver['objetivo']:>9} {gap:>7} {solver['limite_tempo_atingido']:>6}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Orçamento do cache em MB (variável de ambiente)
+ORCAMENTO_MB = float(os.environ.get("CRONOGRAMA_CACHE_MB", 256))
+
+
+def hash_conteudo(conteudo):
+    """
+    Chave do cache para um arquivo enviado: SHA-256 dos bytes. Aceita também um
+    arquivo binário aberto, lido em blocos desde o início e devolvido ao início.
+    """
+    if isinstance(conteudo, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(conteudo).hexdigest()
+    conteudo.seek(0)
+    resumo = hashlib.file_digest(conteudo, "sha256").hexdigest()
+    conteudo.seek(0)
+    return resumo
+
+
+def tamanho_em_bytes(valor):
+    """Estimativa do espaço ocupado por um valor guardado no cache."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Cache LRU limitado por bytes, com contadores de acertos e falhas.
+
+    Os valores são tratados como imutáveis: quem lê do cache não deve alterá-los.
+    """
+
+    def __init__(self, orcamento_bytes=int(ORCAMENTO_MB * 1024 * 1024)):
+        self.orcamento_bytes = orcamento_bytes
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def contem(self, chave):
+        """Se a chave está no cache, sem contar acerto ou falha nem mudar a ordem."""
+        with self._trava:
+            return chave in self._itens
+
+    def guardar(self, chave, valor):
+        tamanho = tamanho_em_bytes(valor)
+        with self._trava:
+            if chave in self._itens:
+                self.bytes_usados -= self._itens.pop(chave)[1]
+            # Um valor maior que o orçamento inteiro nunca é guardado
+            if tamanho > self.orcamento_bytes:
+                return
+            self._itens[chave] = (valor, tamanho)
+            self.bytes_usados += tamanho
+            while self.bytes_usados > self.orcamento_bytes:
+                _, (_, tamanho_removido) = self._itens.popitem(last=False)
+                self.bytes_usados -= tamanho_removido
+                self.remocoes += 1
+
+    def extrair(self, chaves):
+        """Devolve {chave: valor} das chaves presentes (para enviar a outro processo)."""
+        entradas = {}
+        for chave in chaves:
+            valor = self.obter(chave)
+            if valor is not None:
+                entradas[chave] = valor
+        return entradas
+
+    def entradas(self):
+        """Cópia de todas as entradas {chave: valor}, da menos para a mais recente."""
+        with self._trava:
+            return {chave: item[0] for chave, item in self._itens.items()}
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "bytes_usados": self.bytes_usados,
+                "orcamento_bytes": self.orcamento_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "remocoes": self.remocoes,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else None,
+            }
+
+
+# Cache compartilhado pela API (planilhas lidas, matrizes e nomes de abas)
+cache_padrao = CacheLRU()
@@ -1,28 +1,35 @@
+import numpy as np
 import pandas as pd
 
-def criar_matriz(df_sessoes, list_equipes, caminho_arquivo):
+from criar_sessoes import para_int64, tabela_sessoes
+from ingestao import ler_disponibilidade
+
+# Limite de células (sessões x janelas de disponibilidade) avaliadas de uma só vez
+# na comparação vetorizada. Mantém o pico de memória da etapa em poucas dezenas de MB.
+CELULAS_POR_BLOCO = 8_000_000
+
+
+def criar_matriz(df_sessoes, list_equipes, caminho_arquivo, esparsa=False):
     """
     Cria a matriz de disponibilidade.
-    Lê as abas de um arquivo Excel e cruza com o dataframe de sessões.
+    Lê as abas de um arquivo Excel e cruza com as sessões (DataFrame ou TabelaSessoes).
+    `caminho_arquivo` pode ser um caminho, os bytes do arquivo ou um buffer binário.
     """
     # --- 1. Leitura e consolidação dos dados de disponibilidade ---
-    dataframes_equipes = []
-
     try:
-        for equip in list_equipes:
-            df_equipe = pd.read_excel(caminho_arquivo, sheet_name=equip, skiprows=1)
-            dfdisp = df_equipe[["Data","Turma","hora ini","hora fim"]].dropna(subset=["Data"])
-            dfresp = df_equipe[["Nome","Turma.1"]].rename(columns={"Turma.1": 'Turma'}).dropna(subset=['Nome'])
-            df_desnormalizado = pd.merge(dfdisp, dfresp, on='Turma', how='inner')
-            df_desnormalizado = df_desnormalizado[['Data', 'hora ini', 'hora fim', 'Nome', 'Turma']]
-            dataframes_equipes.append(df_desnormalizado)
+        abas = ler_disponibilidade(caminho_arquivo, list_equipes)
     except FileNotFoundError:
         print(f"Erro: O arquivo '{caminho_arquivo}' não foi encontrado.")
         return pd.DataFrame()
     except Exception as e:
-        print(f"Erro ao ler a aba '{equip}' do arquivo Excel. Detalhe: {e}")
+        print(e)
         return pd.DataFrame()
 
+    return montar_matriz(df_sessoes, [abas[equip] for equip in list_equipes], esparsa=esparsa)
+
+
+def montar_matriz(df_sessoes, dataframes_equipes, esparsa=False):
+    """Consolida as abas já lidas e calcula a matriz de disponibilidade."""
     if not dataframes_equipes:
         print("Erro: Nenhuma aba válida encontrada.")
         return pd.DataFrame()
@@ -37,37 +44,51 @@ def criar_matriz(df_sessoes, list_equipes, caminho_arquivo):
         df_disponibilidade_bruta['Data'].astype(str) + ' ' + df_disponibilidade_bruta['hora fim'].astype(str)
     )
 
-    # --- ALTERAÇÃO: Linhas removidas ---
-    # As colunas 'Inicio_Sessao' e 'Fim_Sessao' já existem no df_sessoes
-    
-    pessoas = df_disponibilidade_bruta['Nome'].unique()
-    sessoes = df_sessoes['Sessao'].unique()
-
     # --- 3. Geração da matriz de disponibilidade ---
-    df_matriz_disponibilidade = pd.DataFrame(0, index=sessoes, columns=pessoas)
-    print("Processando a matriz de disponibilidade com a lógica correta...")
-    
-    for sessao_nome in sessoes:
-        sessao_info = df_sessoes.loc[df_sessoes['Sessao'] == sessao_nome].iloc[0]
-        
-        # As colunas já são datetime, lidas diretamente do df_sessoes
-        inicio_sessao = sessao_info['Inicio_Sessao']
-        fim_sessao = sessao_info['Fim_Sessao']
-
-        for pessoa_nome in pessoas:
-            disponibilidade_pessoa = df_disponibilidade_bruta[df_disponibilidade_bruta['Nome'] == pessoa_nome]
-            
-            disponivel = False
-            for _, disp_row in disponibilidade_pessoa.iterrows():
-                inicio_disp = disp_row['Inicio_Disp']
-                fim_disp = disp_row['Fim_Disp']
-                
-                # Verifica se a sessão está contida na disponibilidade
-                if inicio_disp <= inicio_sessao and fim_sessao <= fim_disp:
-                    disponivel = True
-                    break
-            
-            if disponivel:
-                df_matriz_disponibilidade.loc[sessao_nome, pessoa_nome] = 1
-
-    return df_matriz_disponibilidade
\ No newline at end of file
+    print("Processando a matriz de disponibilidade...")
+    return calcular_matriz_disponibilidade(df_sessoes, df_disponibilidade_bruta, esparsa=esparsa)
+
+
+def calcular_matriz_disponibilidade(df_sessoes, df_disponibilidade, esparsa=False):
+    """
+    Calcula a matriz sessão x pessoa (1 = pessoa disponível durante toda a sessão).
+
+    `df_disponibilidade` precisa das colunas 'Nome', 'Inicio_Disp' e 'Fim_Disp'.
+    As janelas são agrupadas por pessoa uma única vez e a contenção
+    (Inicio_Disp <= Inicio_Sessao e Fim_Sessao <= Fim_Disp) é avaliada em bloco
+    com broadcasting do NumPy, reduzindo as janelas de cada pessoa com um OR.
+    """
+    # A ordem de primeira aparição é a mesma de `unique()`, usada pela versão original
+    codigos, pessoas = pd.factorize(df_disponibilidade['Nome'])
+    tabela = tabela_sessoes(df_sessoes)
+    sessoes = tabela.nomes
+
+    matriz = np.zeros((len(sessoes), len(pessoas)), dtype=np.uint8)
+
+    if len(sessoes) and len(pessoas):
+        # Agrupa as janelas por pessoa: cada grupo é um trecho contíguo das colunas
+        ordem = np.argsort(codigos, kind='stable')
+        codigos_ordenados = codigos[ordem]
+        inicio_grupos = np.flatnonzero(np.r_[True, codigos_ordenados[1:] != codigos_ordenados[:-1]])
+
+        inicio_disp = para_int64(df_disponibilidade['Inicio_Disp'])[ordem]
+        fim_disp = para_int64(df_disponibilidade['Fim_Disp'])[ordem]
+        # NaT vira o menor int64, que num início conteria toda sessão até o fim da janela.
+        # Janelas com data ausente não contêm nenhuma sessão (como nas comparações do pandas)
+        ausentes = (df_disponibilidade['Inicio_Disp'].isna() | df_disponibilidade['Fim_Disp'].isna()).to_numpy()[ordem]
+        inicio_disp[ausentes] = np.iinfo(np.int64).max
+        inicio_sessao = tabela.inicio
+        fim_sessao = tabela.fim
+
+        tamanho_bloco = max(1, CELULAS_POR_BLOCO // len(inicio_disp))
+        for inicio in range(0, len(sessoes), tamanho_bloco):
+            fim = inicio + tamanho_bloco
+            contida = (inicio_disp[np.newaxis, :] <= inicio_sessao[inicio:fim, np.newaxis]) & \
+                      (fim_sessao[inicio:fim, np.newaxis] <= fim_disp[np.newaxis, :])
+            matriz[inicio:fim] = np.logical_or.reduceat(contida, inicio_grupos, axis=1)
+
+    df_matriz_disponibilidade = pd.DataFrame(matriz, index=sessoes, columns=pessoas)
+    if esparsa:
+        df_matriz_disponibilidade = df_matriz_disponibilidade.astype(pd.SparseDtype(np.uint8, 0))
+
+    return df_matriz_disponibilidade
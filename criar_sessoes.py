@@ -1,71 +1,163 @@
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
 import pandas as pd
-from datetime import timedelta
+
+
+@dataclass
+class TabelaSessoes:
+    """
+    Sessões em arrays contíguos, com acesso por posição em O(1) sem buscas no DataFrame.
+
+    `inicio` e `fim` são nanossegundos desde a época (int64), `capacidade` é a
+    capacidade de cada sessão e `data` a data do evento (datetime64[D], a do início).
+    `posicao` leva o nome da sessão à sua linha.
+    """
+    nomes: list
+    inicio: np.ndarray
+    fim: np.ndarray
+    capacidade: np.ndarray
+    data: np.ndarray = field(init=False, repr=False)
+    posicao: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.data = self.inicio.view('datetime64[ns]').astype('datetime64[D]')
+        self.posicao = {nome: i for i, nome in enumerate(self.nomes)}
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def posicoes(self, nomes):
+        """Posições (array de inteiros) das sessões `nomes`, na ordem dada."""
+        return np.fromiter((self.posicao[nome] for nome in nomes), dtype=np.intp, count=len(nomes))
+
+
+def tabela_sessoes(df_sessoes):
+    """
+    Monta a TabelaSessoes a partir do DataFrame de sessões (uma linha por nome, a
+    primeira). Uma TabelaSessoes já pronta é devolvida como está, então as etapas
+    seguintes aceitam qualquer um dos dois.
+    """
+    if isinstance(df_sessoes, TabelaSessoes):
+        return df_sessoes
+    sessoes_unicas = df_sessoes.drop_duplicates(subset='Sessao')
+    if 'Capacidade' in sessoes_unicas:
+        capacidade = sessoes_unicas['Capacidade'].to_numpy(dtype=np.int64)
+    else:
+        capacidade = np.zeros(len(sessoes_unicas), dtype=np.int64)
+    return TabelaSessoes(
+        nomes=sessoes_unicas['Sessao'].tolist(),
+        inicio=para_int64(sessoes_unicas['Inicio_Sessao']),
+        fim=para_int64(sessoes_unicas['Fim_Sessao']),
+        capacidade=np.ascontiguousarray(capacidade),
+    )
+
+
+def aplicar_capacidades(tabela, capacidades):
+    """
+    Sobrescreve capacidades da tabela. As chaves de `capacidades` são nomes de sessão
+    ou horários de início ('HH:MM', valem para todas as sessões que começam nesse
+    horário); o nome da sessão tem precedência sobre o horário. Chaves que não
+    correspondem a nenhuma sessão e capacidades menores que 1 geram ValueError.
+    """
+    por_horario, por_nome = {}, {}
+    for chave, capacidade in capacidades.items():
+        if isinstance(capacidade, bool) or not isinstance(capacidade, int) or capacidade < 1:
+            raise ValueError(f"Capacidade inválida para '{chave}': {capacidade!r} (use um inteiro maior que zero).")
+        if chave in tabela.posicao:
+            por_nome[tabela.posicao[chave]] = capacidade
+        elif re.fullmatch(r"\d{1,2}:\d{2}", chave):
+            por_horario[chave] = (pd.Timedelta(f"{chave}:00").value, capacidade)
+        else:
+            raise ValueError(f"Capacidade para sessão ou horário desconhecido: '{chave}'.")
+
+    capacidade_nova = tabela.capacidade.copy()
+    if por_horario:
+        horario = tabela.inicio - tabela.data.astype('datetime64[ns]').view(np.int64)
+        for chave, (deslocamento, capacidade) in por_horario.items():
+            selecionadas = horario == deslocamento
+            if not selecionadas.any():
+                raise ValueError(f"Nenhuma sessão começa às {chave}.")
+            capacidade_nova[selecionadas] = capacidade
+    for posicao, capacidade in por_nome.items():
+        capacidade_nova[posicao] = capacidade
+    tabela.capacidade = capacidade_nova
+    return tabela
+
+
+def para_int64(serie):
+    """Converte uma série de datas em nanossegundos (int64) desde a época, num array contíguo."""
+    if not pd.api.types.is_datetime64_ns_dtype(serie):
+        serie = pd.to_datetime(serie)
+    return np.ascontiguousarray(serie.to_numpy(dtype='datetime64[ns]').view(np.int64))
+
 
 def criar_sessoes(data_inicio_str, data_fim_str, dias_da_semana, horarios_inicio_list, duracao_sessao_horas, capacidade_padrao):
     """
     Cria um DataFrame com todas as sessões possíveis,
     já incluindo colunas de datetime para início e fim.
+
+    As sessões saem de uma grade de datas (datetime64) somada aos deslocamentos
+    dos horários de início, sem cruzamentos de DataFrames nem conversões para texto.
+    O fim é o início mais a duração, então sessões que passam da meia-noite
+    terminam no dia seguinte.
     """
     try:
         # 1. Gerar o range de datas
-        df_datas = pd.DataFrame(pd.date_range(start=data_inicio_str, end=data_fim_str), columns=['Data do evento'])
-        df_datas['Dia_Semana'] = df_datas['Data do evento'].dt.dayofweek
-        
+        datas = np.arange(
+            np.datetime64(pd.Timestamp(data_inicio_str).date(), 'D'),
+            np.datetime64(pd.Timestamp(data_fim_str).date(), 'D') + 1,
+        )
+        # 1970-01-01 foi uma quinta-feira (3, com segunda = 0)
+        dia_semana = (datas.view(np.int64) + 3) % 7
+
         # 2. Filtrar pelos dias da semana selecionados
-        df_datas_filtrado = df_datas[df_datas['Dia_Semana'].isin(dias_da_semana)].copy()
+        selecionadas = np.isin(dia_semana, [int(d) for d in dias_da_semana])
+        datas, dia_semana = datas[selecionadas], dia_semana[selecionadas]
 
-        if df_datas_filtrado.empty:
+        if len(datas) == 0:
             print("Nenhuma data válida encontrada para os dias da semana selecionados.")
             return pd.DataFrame()
 
-        # 3. Processar horários
-        horarios_processados = []
+        # 3. Processar horários (deslocamento desde a meia-noite)
+        duracao = np.timedelta64(int(round(float(duracao_sessao_horas) * 3600)), 's').astype('timedelta64[ns]')
+        deslocamentos, horas_ini, horas_fim = [], [], []
         for h in horarios_inicio_list:
             try:
-                hora_inicio = pd.to_datetime(h).time()
-                hora_fim = (pd.to_datetime(h) + timedelta(hours=duracao_sessao_horas)).time()
-                horarios_processados.append({'Hora ini': hora_inicio, 'Hora fim': hora_fim})
+                instante = pd.to_datetime(h)
+                deslocamentos.append((instante - instante.normalize()).to_timedelta64())
+                horas_ini.append(str(instante.time()))
+                horas_fim.append(str((instante + pd.Timedelta(duracao)).time()))
             except Exception as e:
                 print(f"Ignorando horário mal formatado: {h}. Erro: {e}")
                 continue
-        
-        if not horarios_processados:
-            print("Nenhum horário válido foi processado.")
-            return pd.DataFrame()
-
-        df_horarios = pd.DataFrame(horarios_processados)
-
-        # 4. Cruzar datas e horários para criar sessões
-        df_datas_filtrado['key'] = 1
-        df_horarios['key'] = 1
-        df_sessoes = pd.merge(df_datas_filtrado, df_horarios, on='key').drop('key', axis=1)
 
-        if df_sessoes.empty:
-            print("Nenhuma sessão foi criada a partir do cruzamento de datas e horários.")
+        if not deslocamentos:
+            print("Nenhum horário válido foi processado.")
             return pd.DataFrame()
 
-        # 5. Adicionar informações restantes
-        df_sessoes['Sessao'] = [f"sessao_{i+1}" for i in range(len(df_sessoes))]
-        df_sessoes['Capacidade'] = capacidade_padrao
-
-        # --- ALTERAÇÃO IMPORTANTE: Adicionar colunas de datetime ---
-        df_sessoes['Inicio_Sessao'] = pd.to_datetime(
-            df_sessoes['Data do evento'].astype(str) + ' ' + df_sessoes['Hora ini'].astype(str)
-        )
-        df_sessoes['Fim_Sessao'] = pd.to_datetime(
-            df_sessoes['Data do evento'].astype(str) + ' ' + df_sessoes['Hora fim'].astype(str)
-        )
-        # --------------------------------------------------------
+        # 4. Cruzar datas e horários para criar sessões (ordem: data, depois horário)
+        deslocamentos = np.array(deslocamentos, dtype='timedelta64[ns]')
+        n_datas, n_horarios = len(datas), len(deslocamentos)
+        datas_ns = datas.astype('datetime64[ns]')
+        inicio = (datas_ns[:, np.newaxis] + deslocamentos[np.newaxis, :]).ravel()
+        n_sessoes = len(inicio)
 
-        # 6. Reordenar colunas
-        colunas_finais = [
-            'Sessao', 'Data do evento', 'Dia_Semana', 'Hora ini', 'Hora fim', 
-            'Inicio_Sessao', 'Fim_Sessao', 'Capacidade'
-        ]
-        df_sessoes = df_sessoes[colunas_finais]
+        # 5. Montar o DataFrame com as informações restantes
+        df_sessoes = pd.DataFrame({
+            'Sessao': np.array([f"sessao_{i+1}" for i in range(n_sessoes)], dtype=object),
+            'Data do evento': np.repeat(datas_ns, n_horarios),
+            'Dia_Semana': np.repeat(dia_semana, n_horarios),
+            'Hora ini': np.tile(np.array(horas_ini, dtype=object), n_datas),
+            'Hora fim': np.tile(np.array(horas_fim, dtype=object), n_datas),
+            'Inicio_Sessao': inicio,
+            'Fim_Sessao': inicio + duracao,
+            'Capacidade': capacidade_padrao,
+        })
 
         return df_sessoes
 
     except Exception as e:
         print(f"Erro inesperado em criar_sessoes: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
@@ -0,0 +1,195 @@
+import heapq
+import math
+from collections import deque
+
+# Limite de nós visitados em cada busca de caminho aumentante (mantém a heurística em milissegundos)
+LIMITE_BUSCA = 5_000
+
+
+def alocacao_gulosa(subproblema):
+    """
+    Solução viável rápida para um subproblema de alocação.
+
+    1. Cobertura gulosa: abre repetidamente a sessão que cobre mais pessoas ainda
+       sem sessão (limitado pela capacidade), se não conflitar com uma já aberta.
+       Em cada sessão entram primeiro as pessoas com menos alternativas.
+    2. Reparo: para cada pessoa sem sessão, procura um caminho aumentante que a
+       encaixe remanejando outras pessoas entre sessões abertas (ou abrindo uma
+       sessão que não conflite com as abertas).
+    3. Enxugamento: fecha sessões cujos integrantes cabem em outras sessões abertas.
+    """
+    estado = _EstadoAlocacao(subproblema)
+    estado.cobertura_gulosa()
+    estado.reparar()
+    estado.enxugar()
+    return estado.solucao()
+
+
+def limite_inferior(subproblema):
+    """
+    Limite inferior simples para o objetivo `sessões + (n + 1) * não alocados` do subproblema.
+
+    Supõe todos alocados (qualquer não alocado custa mais que todas as sessões juntas)
+    e conta as sessões necessárias usando a maior capacidade disponível. Sem nenhuma
+    sessão com capacidade positiva, ninguém pode ser alocado.
+    """
+    n = len(subproblema["pessoas"])
+    if not n:
+        return 0
+    maior_capacidade = max(subproblema["capacidades"].values())
+    if maior_capacidade <= 0:
+        return (n + 1) * n
+    return math.ceil(n / maior_capacidade)
+
+
+class _EstadoAlocacao:
+    """Estado mutável da heurística: sessões abertas, bloqueios e sessão de cada pessoa."""
+
+    def __init__(self, subproblema):
+        self.sessoes = subproblema["sessoes"]
+        self.pessoas = subproblema["pessoas"]
+        self.pessoas_por_sessao = subproblema["pessoas_por_sessao"]
+        # Capacidade negativa equivale a zero: a sessão não recebe ninguém
+        self.capacidades = {s: max(c, 0) for s, c in subproblema["capacidades"].items()}
+
+        self.conflitos = {s: set() for s in self.sessoes}
+        for grupo in subproblema["grupos_conflitantes"]:
+            for s in grupo:
+                self.conflitos[s].update(grupo)
+        for s in self.sessoes:
+            self.conflitos[s].discard(s)
+
+        self.sessoes_por_pessoa = {p: [] for p in self.pessoas}
+        for s in self.sessoes:
+            for p in self.pessoas_por_sessao[s]:
+                self.sessoes_por_pessoa[p].append(s)
+
+        self.integrantes = {}         # sessão aberta -> set de pessoas
+        self.sessao_da_pessoa = {}    # pessoa alocada -> sessão
+        self.bloqueios = {s: 0 for s in self.sessoes}  # nº de sessões abertas conflitantes
+
+    # --- operações básicas ---
+
+    def pode_abrir(self, s):
+        return s not in self.integrantes and self.bloqueios[s] == 0
+
+    def abrir(self, s):
+        self.integrantes[s] = set()
+        for c in self.conflitos[s]:
+            self.bloqueios[c] += 1
+
+    def fechar(self, s):
+        del self.integrantes[s]
+        for c in self.conflitos[s]:
+            self.bloqueios[c] -= 1
+
+    def alocar(self, p, s):
+        anterior = self.sessao_da_pessoa.get(p)
+        if anterior is not None:
+            self.integrantes[anterior].discard(p)
+        self.integrantes[s].add(p)
+        self.sessao_da_pessoa[p] = s
+
+    def tem_vaga(self, s):
+        return len(self.integrantes[s]) < self.capacidades[s]
+
+    # --- fases ---
+
+    def cobertura_gulosa(self):
+        # O ganho de uma sessão só diminui; a fila preguiçosa recalcula ao chegar ao topo
+        def ganho(s):
+            return min(self.capacidades[s], sum(1 for p in self.pessoas_por_sessao[s] if p not in self.sessao_da_pessoa))
+
+        fila = [(-ganho(s), i, s) for i, s in enumerate(self.sessoes)]
+        heapq.heapify(fila)
+        while fila:
+            negativo, i, s = heapq.heappop(fila)
+            if not self.pode_abrir(s):
+                continue
+            atual = ganho(s)
+            if atual == 0:
+                break
+            if atual < -negativo:
+                heapq.heappush(fila, (-atual, i, s))
+                continue
+
+            candidatos = sorted(
+                (p for p in self.pessoas_por_sessao[s] if p not in self.sessao_da_pessoa),
+                key=lambda p: len(self.sessoes_por_pessoa[p])
+            )
+            self.abrir(s)
+            for p in candidatos[:self.capacidades[s]]:
+                self.alocar(p, s)
+
+    def reparar(self):
+        sem_sessao = sorted(
+            (p for p in self.pessoas if p not in self.sessao_da_pessoa),
+            key=lambda p: len(self.sessoes_por_pessoa[p])
+        )
+        for p in sem_sessao:
+            self._caminho_aumentante(p)
+
+    def _caminho_aumentante(self, origem):
+        """
+        Busca em largura por uma cadeia origem -> s1 (q1 sai de s1) -> s2 ... que termina
+        numa sessão aberta com vaga ou numa sessão que pode ser aberta.
+        """
+        anterior = {}  # sessão -> (pessoa que entra nela, sessão de onde a pessoa sai)
+        fila = deque([(origem, None)])
+        visitadas = set()
+        pessoas_vistas = {origem}
+        while fila and len(visitadas) < LIMITE_BUSCA:
+            p, sessao_origem = fila.popleft()
+            for s in self.sessoes_por_pessoa[p]:
+                # Sessão sem capacidade nunca recebe ninguém (nem aberta agora)
+                if s in visitadas or s == sessao_origem or self.capacidades[s] < 1:
+                    continue
+                aberta = s in self.integrantes
+                if not aberta and not self.pode_abrir(s):
+                    continue
+                visitadas.add(s)
+                anterior[s] = (p, sessao_origem)
+                if not aberta or self.tem_vaga(s):
+                    self._aplicar_caminho(s, anterior)
+                    return True
+                for q in self.integrantes[s]:
+                    if q not in pessoas_vistas:
+                        pessoas_vistas.add(q)
+                        fila.append((q, s))
+        return False
+
+    def _aplicar_caminho(self, destino, anterior):
+        if destino not in self.integrantes:
+            self.abrir(destino)
+        s = destino
+        while s is not None:
+            p, s_origem = anterior[s]
+            self.alocar(p, s)
+            s = s_origem
+
+    def enxugar(self):
+        # Tenta fechar primeiro as sessões mais vazias
+        for s in sorted(self.integrantes, key=lambda s: len(self.integrantes[s])):
+            movimentos = {}
+            vagas = {}
+            for p in self.integrantes[s]:
+                destino = next(
+                    (t for t in self.sessoes_por_pessoa[p]
+                     if t != s and t in self.integrantes
+                     and len(self.integrantes[t]) + vagas.get(t, 0) < self.capacidades[t]),
+                    None
+                )
+                if destino is None:
+                    break
+                movimentos[p] = destino
+                vagas[destino] = vagas.get(destino, 0) + 1
+            else:
+                for p, destino in movimentos.items():
+                    self.alocar(p, destino)
+                self.fechar(s)
+
+    def solucao(self):
+        alocacoes = {s: [p for p in self.pessoas_por_sessao[s] if p in membros]
+                     for s, membros in self.integrantes.items() if membros}
+        nao_alocados = [p for p in self.pessoas if p not in self.sessao_da_pessoa]
+        return {"alocacoes": alocacoes, "nao_alocados": nao_alocados}
@@ -0,0 +1,157 @@
+import io
+import os
+
+import openpyxl
+import pandas as pd
+
+# Linha (1-based) do cabeçalho nas abas das equipes; a primeira linha é um título
+LINHA_CABECALHO = 2
+
+# Colunas lidas de cada aba. A planilha tem duas tabelas lado a lado que repetem
+# o cabeçalho 'Turma': a primeira ocorrência é a das janelas de disponibilidade e
+# a segunda a dos responsáveis (o 'Turma.1' do pandas).
+COLUNAS_DISPONIBILIDADE = ["Data", "Turma", "hora ini", "hora fim"]
+COLUNAS_RESPONSAVEIS = ["Nome", "Turma"]
+
+# Tipos explícitos das colunas de texto/horário ('Data' vira datetime64 quando só há datas)
+TIPOS_COLUNAS = {"Turma": object, "hora ini": object, "hora fim": object, "Nome": object}
+
+
+def abrir_fonte(fonte):
+    """Aceita bytes, um caminho ou um objeto de arquivo binário e devolve algo legível pelo openpyxl."""
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        return io.BytesIO(fonte)
+    if isinstance(fonte, (str, os.PathLike)):
+        return fonte
+    if hasattr(fonte, "seek"):
+        fonte.seek(0)
+    return fonte
+
+
+def nomes_abas(fonte):
+    """Nomes das abas, lidos apenas do índice do workbook."""
+    workbook = openpyxl.load_workbook(abrir_fonte(fonte), read_only=True, data_only=True, keep_links=False)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def ler_disponibilidade(fonte, list_equipes):
+    """
+    Lê as abas das equipes e devolve {equipe: DataFrame} com as colunas
+    'Data', 'hora ini', 'hora fim', 'Nome' e 'Turma' (uma linha por janela e pessoa).
+
+    O arquivo é aberto uma única vez em modo somente leitura (streaming) e, de cada
+    aba, só as colunas necessárias são copiadas. Erros de leitura são propagados
+    com o nome da aba na mensagem.
+    """
+    workbook = openpyxl.load_workbook(abrir_fonte(fonte), read_only=True, data_only=True, keep_links=False)
+    try:
+        abas = {}
+        for equip in list_equipes:
+            if equip not in workbook.sheetnames:
+                raise ValueError(f"Erro ao ler a aba '{equip}' do arquivo Excel. Detalhe: Worksheet named '{equip}' not found")
+            abas[equip] = _ler_aba(workbook[equip], equip)
+        return abas
+    finally:
+        workbook.close()
+
+
+def validar_planilha(fonte, list_equipes):
+    """
+    Verificação rápida antes da leitura completa: confere, pelo índice do workbook,
+    se as abas das equipes existem e, em cada uma, só a linha de cabeçalho. Levanta
+    ValueError com todos os problemas encontrados (abas e colunas ausentes).
+    """
+    try:
+        workbook = openpyxl.load_workbook(abrir_fonte(fonte), read_only=True, data_only=True, keep_links=False)
+    except Exception as e:
+        raise ValueError(f"O arquivo não é um Excel (.xlsx) válido. Detalhe: {e}")
+    try:
+        problemas = []
+        for equip in dict.fromkeys(list_equipes):
+            if equip not in workbook.sheetnames:
+                problemas.append(f"aba '{equip}' não encontrada")
+                continue
+            linhas = workbook[equip].iter_rows(min_row=LINHA_CABECALHO, max_row=LINHA_CABECALHO, values_only=True)
+            _, _, ausentes = localizar_colunas(next(linhas, None) or ())
+            if ausentes:
+                problemas.append(
+                    f"aba '{equip}': coluna(s) ausente(s) na linha {LINHA_CABECALHO}: {', '.join(ausentes)}"
+                )
+        if problemas:
+            if any("não encontrada" in problema for problema in problemas):
+                problemas.append(f"abas disponíveis: {', '.join(workbook.sheetnames)}")
+            raise ValueError("Planilha inválida: " + "; ".join(problemas) + ".")
+    finally:
+        workbook.close()
+
+
+def localizar_colunas(cabecalho):
+    """
+    Posições das colunas usadas no cabeçalho da aba.
+    Devolve (posicoes_disponibilidade, posicoes_responsaveis, colunas_ausentes).
+    """
+    nomes = [str(valor).strip() if valor is not None else None for valor in cabecalho]
+    ocorrencias_turma = [i for i, nome in enumerate(nomes) if nome == "Turma"]
+
+    posicoes = {}
+    for coluna in ("Data", "hora ini", "hora fim", "Nome"):
+        if coluna in nomes:
+            posicoes[coluna] = nomes.index(coluna)
+
+    ausentes = [coluna for coluna in ("Data", "hora ini", "hora fim", "Nome") if coluna not in posicoes]
+    if len(ocorrencias_turma) < 1:
+        ausentes.append("Turma")
+    if len(ocorrencias_turma) < 2:
+        ausentes.append("Turma.1")
+
+    if ausentes:
+        return None, None, ausentes
+
+    posicoes_disp = [posicoes["Data"], ocorrencias_turma[0], posicoes["hora ini"], posicoes["hora fim"]]
+    posicoes_resp = [posicoes["Nome"], ocorrencias_turma[1]]
+    return posicoes_disp, posicoes_resp, []
+
+
+def _ler_aba(planilha, equip):
+    linhas = planilha.iter_rows(min_row=LINHA_CABECALHO, values_only=True)
+    cabecalho = next(linhas, None) or ()
+    posicoes_disp, posicoes_resp, ausentes = localizar_colunas(cabecalho)
+    if ausentes:
+        raise ValueError(
+            f"Erro ao ler a aba '{equip}' do arquivo Excel. Detalhe: coluna(s) ausente(s): {', '.join(ausentes)}"
+        )
+
+    disponibilidade = []
+    responsaveis = []
+    for linha in linhas:
+        valores_disp = [_valor(linha, i) for i in posicoes_disp]
+        if valores_disp[0] is not None:
+            disponibilidade.append(valores_disp)
+        valores_resp = [_valor(linha, i) for i in posicoes_resp]
+        if valores_resp[0] is not None:
+            responsaveis.append(valores_resp)
+
+    dfdisp = _para_dataframe(disponibilidade, COLUNAS_DISPONIBILIDADE)
+    dfresp = _para_dataframe(responsaveis, COLUNAS_RESPONSAVEIS)
+    df_desnormalizado = pd.merge(dfdisp, dfresp, on='Turma', how='inner')
+    return df_desnormalizado[['Data', 'hora ini', 'hora fim', 'Nome', 'Turma']]
+
+
+def _valor(linha, posicao):
+    """Valor da célula como o pandas leria: texto vazio é ausente e floats inteiros viram int."""
+    if posicao >= len(linha):
+        return None
+    valor = linha[posicao]
+    if isinstance(valor, str) and not valor.strip():
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _para_dataframe(linhas, colunas):
+    # Células de data chegam como datetime e a coluna 'Data' é inferida como datetime64
+    return pd.DataFrame(linhas, columns=colunas).astype({c: t for c, t in TIPOS_COLUNAS.items() if c in colunas})
@@ -0,0 +1,146 @@
+import json
+import os
+import time
+import uuid
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from criar_sessoes import TabelaSessoes, tabela_sessoes
+
+# --- Configuração (variáveis de ambiente) ---
+# Diretório em que cada chamada de `otimizar_cronograma` grava a instância resolvida; vazio desliga a captura
+DIRETORIO_CAPTURA = os.environ.get("CRONOGRAMA_DIRETORIO_CAPTURA") or None
+
+# Versão do formato; muda quando os arrays ou a configuração mudam de forma incompatível
+VERSAO_FORMATO = 1
+EXTENSAO = ".npz"
+
+
+def exportar_instancia(caminho, df_sessoes, df_matriz, configuracao):
+    """
+    Grava a instância de `otimizar_cronograma` num .npz sem compressão.
+
+    As sessões vão como arrays int64 (início e fim em nanossegundos desde a época e
+    capacidade), a matriz de disponibilidade em formato CSR por sessão (só os pares
+    disponíveis) e `configuracao` (parâmetros da otimização e do solver) como JSON.
+    Os arrays são numéricos ou de texto fixo, então a leitura não usa pickle.
+    """
+    tabela = tabela_sessoes(df_sessoes)
+    matriz = df_matriz.to_numpy(dtype=bool)
+    linhas, colunas = np.nonzero(matriz)
+    ponteiros = np.zeros(matriz.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(linhas, minlength=matriz.shape[0]), out=ponteiros[1:])
+
+    with open(caminho, "wb") as arquivo:
+        np.savez(
+            arquivo,
+            versao=np.int64(VERSAO_FORMATO),
+            configuracao=np.str_(json.dumps(configuracao)),
+            sessoes_nomes=np.array(tabela.nomes, dtype=str),
+            sessoes_inicio=tabela.inicio,
+            sessoes_fim=tabela.fim,
+            sessoes_capacidade=tabela.capacidade,
+            pessoas=np.array(df_matriz.columns.tolist(), dtype=str),
+            matriz_sessoes=tabela.posicoes(df_matriz.index.tolist()).astype(np.int64),
+            matriz_ponteiros=ponteiros,
+            matriz_pessoas=colunas.astype(np.int32),
+        )
+    return caminho
+
+
+def capturar_instancia(df_sessoes, df_matriz, configuracao, diretorio=None):
+    """
+    Grava a instância em `diretorio` (padrão: CRONOGRAMA_DIRETORIO_CAPTURA) com um nome
+    único. Sem diretório não faz nada. Uma falha na gravação não interrompe a otimização.
+    """
+    diretorio = diretorio or DIRETORIO_CAPTURA
+    if not diretorio:
+        return None
+    caminho = os.path.join(diretorio, f"{time.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}{EXTENSAO}")
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        return exportar_instancia(caminho, df_sessoes, df_matriz, configuracao)
+    except Exception as e:
+        print(f"Não foi possível capturar a instância em '{caminho}'. Erro: {e}")
+        return None
+
+
+def carregar_instancia(caminho, mmap=True):
+    """
+    Lê uma instância gravada por `exportar_instancia`. Devolve (tabela, df_matriz,
+    configuracao), prontos para `otimizar_cronograma(tabela, df_matriz, **configuracao)`.
+
+    Com `mmap=True` os arrays são mapeados do arquivo em vez de copiados para a memória.
+    Versões de formato desconhecidas geram ValueError.
+    """
+    arrays = _ler_arrays(caminho, mmap)
+    versao = int(arrays["versao"])
+    if versao != VERSAO_FORMATO:
+        raise ValueError(f"Versão de formato da instância não suportada: {versao} (esperada: {VERSAO_FORMATO}).")
+
+    tabela = TabelaSessoes(
+        nomes=arrays["sessoes_nomes"].tolist(),
+        inicio=arrays["sessoes_inicio"],
+        fim=arrays["sessoes_fim"],
+        capacidade=arrays["sessoes_capacidade"],
+    )
+
+    # A matriz densa é o que o otimizador consome; o arquivo guarda só os pares disponíveis
+    ponteiros = arrays["matriz_ponteiros"]
+    matriz = np.zeros((len(ponteiros) - 1, len(arrays["pessoas"])), dtype=np.int8)
+    matriz[np.repeat(np.arange(len(ponteiros) - 1), np.diff(ponteiros)), arrays["matriz_pessoas"]] = 1
+    nomes_sessoes = [tabela.nomes[i] for i in arrays["matriz_sessoes"].tolist()]
+    df_matriz = pd.DataFrame(matriz, index=nomes_sessoes, columns=arrays["pessoas"].tolist())
+
+    return tabela, df_matriz, json.loads(str(arrays["configuracao"]))
+
+
+def listar_instancias(diretorio):
+    """Caminhos das instâncias em `diretorio`, em ordem de nome (a da captura)."""
+    return sorted(
+        os.path.join(diretorio, nome) for nome in os.listdir(diretorio) if nome.endswith(EXTENSAO)
+    )
+
+
+_LEITORES_CABECALHO = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+def _ler_arrays(caminho, mmap):
+    """
+    Arrays do .npz por nome. O `np.load` ignora `mmap_mode` em arquivos .npz; como eles
+    são gravados sem compressão, cada membro é mapeado direto na sua posição do arquivo.
+    """
+    if not mmap:
+        with np.load(caminho, allow_pickle=False) as npz:
+            return {nome: npz[nome] for nome in npz.files}
+
+    arrays = {}
+    with zipfile.ZipFile(caminho) as zip_arquivo, open(caminho, "rb") as arquivo:
+        for info in zip_arquivo.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Membro comprimido na instância '{caminho}': {info.filename}")
+            # Cabeçalho local do membro: 30 bytes fixos mais nome e campo extra de tamanho variável
+            arquivo.seek(info.header_offset + 26)
+            tamanho_nome, tamanho_extra = np.frombuffer(arquivo.read(4), dtype="<u2")
+            arquivo.seek(info.header_offset + 30 + int(tamanho_nome) + int(tamanho_extra))
+            versao = np.lib.format.read_magic(arquivo)
+            if versao not in _LEITORES_CABECALHO:
+                raise ValueError(f"Versão de .npy não suportada na instância '{caminho}': {versao}")
+            forma, ordem_fortran, dtype = _LEITORES_CABECALHO[versao](arquivo)
+            nome = info.filename.removesuffix(".npy")
+            if forma == ():
+                # Escalares (versão, configuração) são lidos direto
+                arrays[nome] = np.frombuffer(arquivo.read(dtype.itemsize), dtype=dtype).reshape(())
+            elif np.prod(forma) == 0:
+                arrays[nome] = np.empty(forma, dtype=dtype)
+            else:
+                arrays[nome] = np.memmap(
+                    caminho, dtype=dtype, mode="r", offset=arquivo.tell(), shape=forma,
+                    order="F" if ordem_fortran else "C",
+                )
+    return arrays
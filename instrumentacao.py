@@ -0,0 +1,259 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+# Com CRONOGRAMA_RASTREAR_MEMORIA=1 o pico de memória do Python em cada etapa é medido
+# com tracemalloc (deixa o processamento mais lento); sem ele, só o RSS no início e no fim da etapa
+RASTREAR_MEMORIA = os.environ.get("CRONOGRAMA_RASTREAR_MEMORIA", "0") == "1"
+NIVEL_LOG = os.environ.get("CRONOGRAMA_NIVEL_LOG", "INFO")
+
+# Id da requisição em andamento, incluído em todos os registros de log
+id_requisicao = contextvars.ContextVar("id_requisicao", default=None)
+
+logger = logging.getLogger("cronograma")
+
+BUCKETS_SEGUNDOS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BUCKETS_BYTES = tuple(2 ** n for n in range(20, 34, 2))  # 1 MB a 8 GB
+BUCKETS_TAMANHO = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BUCKETS_GAP = (0, 0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+# --- Logs estruturados ---
+
+class FormatadorJson(logging.Formatter):
+    """Um objeto JSON por linha, com o id da requisição e os campos passados em `extra={"campos": ...}`."""
+
+    def format(self, record):
+        registro = {
+            "instante": round(record.created, 3),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "evento": record.getMessage(),
+            "id_requisicao": getattr(record, "id_requisicao", None) or id_requisicao.get(),
+        }
+        registro.update(getattr(record, "campos", {}))
+        if record.exc_info:
+            registro["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+def configurar_logs():
+    """Liga os logs estruturados (stderr) do logger 'cronograma'; chamado na API e nos processos das tarefas."""
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(FormatadorJson())
+        logger.addHandler(handler)
+        logger.setLevel(NIVEL_LOG)
+        logger.propagate = False
+    if RASTREAR_MEMORIA and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def registrar_evento(evento, nivel=logging.INFO, **campos):
+    logger.log(nivel, evento, extra={"campos": campos})
+
+
+# --- Métricas no formato de texto do Prometheus ---
+
+class RegistroMetricas:
+    """
+    Contadores, medidores e histogramas com rótulos, exportados no formato de texto
+    do Prometheus. Cada métrica é declarada uma vez com tipo, descrição e buckets.
+    """
+
+    def __init__(self):
+        self._declaracoes = {}
+        self._valores = {}
+        self._trava = threading.Lock()
+
+    def declarar(self, nome, tipo, ajuda, buckets=None):
+        self._declaracoes[nome] = (tipo, ajuda, tuple(buckets) if buckets else None)
+        self._valores.setdefault(nome, {})
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = _chave_rotulos(rotulos)
+        with self._trava:
+            serie = self._valores[nome]
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def definir(self, nome, valor, **rotulos):
+        with self._trava:
+            self._valores[nome][_chave_rotulos(rotulos)] = valor
+
+    def observar(self, nome, valor, **rotulos):
+        buckets = self._declaracoes[nome][2]
+        chave = _chave_rotulos(rotulos)
+        with self._trava:
+            serie = self._valores[nome]
+            if chave not in serie:
+                serie[chave] = {"contagens": [0] * len(buckets), "soma": 0.0, "total": 0}
+            estado = serie[chave]
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    estado["contagens"][i] += 1
+            estado["soma"] += valor
+            estado["total"] += 1
+
+    def exportar(self):
+        linhas = []
+        with self._trava:
+            for nome, (tipo, ajuda, buckets) in self._declaracoes.items():
+                linhas.append(f"# HELP {nome} {ajuda}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                for chave, valor in sorted(self._valores[nome].items()):
+                    if tipo != "histogram":
+                        linhas.append(f"{nome}{_formatar_rotulos(chave)} {_formatar_numero(valor)}")
+                        continue
+                    for limite, contagem in zip(buckets, valor["contagens"]):
+                        rotulos = _formatar_rotulos(chave + (("le", _formatar_numero(limite)),))
+                        linhas.append(f"{nome}_bucket{rotulos} {contagem}")
+                    linhas.append(f"{nome}_bucket{_formatar_rotulos(chave + (('le', '+Inf'),))} {valor['total']}")
+                    linhas.append(f"{nome}_sum{_formatar_rotulos(chave)} {_formatar_numero(valor['soma'])}")
+                    linhas.append(f"{nome}_count{_formatar_rotulos(chave)} {valor['total']}")
+        return "\n".join(linhas) + "\n"
+
+
+def _chave_rotulos(rotulos):
+    return tuple(sorted((nome, str(valor)) for nome, valor in rotulos.items()))
+
+
+def _formatar_rotulos(chave):
+    if not chave:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in chave) + "}"
+
+
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_numero(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+registro_padrao = RegistroMetricas()
+registro_padrao.declarar("cronograma_requisicoes_total", "counter", "Requisições HTTP atendidas, por rota, método e status.")
+registro_padrao.declarar("cronograma_requisicao_duracao_segundos", "histogram", "Duração das requisições HTTP, por rota.", BUCKETS_SEGUNDOS)
+registro_padrao.declarar("cronograma_execucoes_total", "counter", "Execuções do pipeline, por resultado (sucesso ou erro).")
+registro_padrao.declarar("cronograma_etapa_duracao_segundos", "histogram", "Tempo de parede de cada etapa.", BUCKETS_SEGUNDOS)
+registro_padrao.declarar("cronograma_etapa_rss_crescimento_bytes", "histogram", "Crescimento do RSS do processo durante cada etapa (fim - início, mínimo 0).", BUCKETS_BYTES)
+registro_padrao.declarar("cronograma_etapa_memoria_python_pico_bytes", "histogram", "Pico de memória do Python na etapa (tracemalloc).", BUCKETS_BYTES)
+registro_padrao.declarar("cronograma_modelo_variaveis", "histogram", "Variáveis do modelo por otimização.", BUCKETS_TAMANHO)
+registro_padrao.declarar("cronograma_modelo_restricoes", "histogram", "Restrições do modelo por otimização.", BUCKETS_TAMANHO)
+registro_padrao.declarar("cronograma_modelo_nao_nulos", "histogram", "Coeficientes não nulos das restrições por otimização.", BUCKETS_TAMANHO)
+registro_padrao.declarar("cronograma_solver_execucoes_total", "counter", "Execuções do solver (um por componente), por backend e status.")
+registro_padrao.declarar("cronograma_solver_limite_tempo_total", "counter", "Execuções do solver interrompidas pelo limite de tempo.")
+registro_padrao.declarar("cronograma_solver_gap_relativo", "histogram", "Maior gap relativo entre os componentes de uma otimização.", BUCKETS_GAP)
+registro_padrao.declarar("cronograma_solver_objetivo", "gauge", "Objetivo da última otimização (sessões + penalidade x não alocados).")
+registro_padrao.declarar("cronograma_processo_rss_pico_bytes", "gauge", "Pico de RSS do processo da API desde o início.")
+registro_padrao.declarar("cronograma_cache_itens", "gauge", "Entradas no cache compartilhado.")
+registro_padrao.declarar("cronograma_cache_bytes", "gauge", "Bytes ocupados no cache compartilhado.")
+registro_padrao.declarar("cronograma_cache_consultas_total", "counter", "Consultas ao cache compartilhado, por resultado.")
+
+
+# --- Medições de uma execução ---
+
+class Instrumentacao:
+    """
+    Medições de uma execução do pipeline (ou do relatório).
+
+    As medições são dicionários simples: podem voltar do processo de uma tarefa
+    e ser publicadas nas métricas do processo da API com `publicar`.
+    """
+
+    def __init__(self, id_requisicao_atual=None):
+        self.id_requisicao = id_requisicao_atual or id_requisicao.get()
+        self.medicoes = []
+
+    @contextlib.contextmanager
+    def etapa(self, nome):
+        """Mede tempo de parede e memória do bloco."""
+        if RASTREAR_MEMORIA and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        rss_inicio = rss_atual_bytes()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            medicao = {
+                "tipo": "etapa",
+                "etapa": nome,
+                "duracao_segundos": round(time.perf_counter() - inicio, 4),
+            }
+            rss_fim = rss_atual_bytes()
+            if rss_inicio is not None and rss_fim is not None:
+                medicao["rss_inicio_bytes"] = rss_inicio
+                medicao["rss_fim_bytes"] = rss_fim
+            if RASTREAR_MEMORIA and tracemalloc.is_tracing():
+                medicao["memoria_python_pico_bytes"] = tracemalloc.get_traced_memory()[1]
+            self.registrar(medicao)
+
+    def registrar_otimizacao(self, estatisticas_modelo):
+        """Tamanho do modelo e resumo do solver devolvidos em `estatisticas_modelo`."""
+        self.registrar({"tipo": "otimizacao", **estatisticas_modelo})
+
+    def registrar_execucao(self, sucesso, **campos):
+        self.registrar({"tipo": "execucao", "resultado": "sucesso" if sucesso else "erro", **campos})
+
+    def registrar(self, medicao):
+        self.medicoes.append(medicao)
+        logger.info(medicao["tipo"], extra={"campos": medicao, "id_requisicao": self.id_requisicao})
+
+
+def publicar(medicoes, registro=None):
+    """Atualiza as métricas a partir das medições de uma execução."""
+    if registro is None:
+        registro = registro_padrao
+    for medicao in medicoes:
+        if medicao["tipo"] == "etapa":
+            registro.observar("cronograma_etapa_duracao_segundos", medicao["duracao_segundos"], etapa=medicao["etapa"])
+            if "rss_fim_bytes" in medicao:
+                registro.observar("cronograma_etapa_rss_crescimento_bytes",
+                                  max(0, medicao["rss_fim_bytes"] - medicao["rss_inicio_bytes"]), etapa=medicao["etapa"])
+            if "memoria_python_pico_bytes" in medicao:
+                registro.observar("cronograma_etapa_memoria_python_pico_bytes", medicao["memoria_python_pico_bytes"],
+                                  etapa=medicao["etapa"])
+        elif medicao["tipo"] == "otimizacao":
+            for etapa, campo in (("construcao_modelo", "tempo_construcao_segundos"), ("solver", "tempo_solver_segundos")):
+                if campo in medicao:
+                    registro.observar("cronograma_etapa_duracao_segundos", medicao[campo], etapa=etapa)
+            registro.observar("cronograma_modelo_variaveis", medicao.get("variaveis", 0))
+            registro.observar("cronograma_modelo_restricoes", medicao.get("restricoes", 0))
+            registro.observar("cronograma_modelo_nao_nulos", medicao.get("nao_nulos", 0))
+            solver = medicao.get("solver")
+            if solver:
+                for status, quantidade in solver["status"].items():
+                    registro.incrementar("cronograma_solver_execucoes_total", quantidade,
+                                         backend=solver.get("backend"), status=status)
+                registro.incrementar("cronograma_solver_limite_tempo_total", solver["limite_tempo_atingido"])
+                if solver["gap_relativo"] is not None:
+                    registro.observar("cronograma_solver_gap_relativo", solver["gap_relativo"])
+                if solver.get("objetivo") is not None:
+                    registro.definir("cronograma_solver_objetivo", solver["objetivo"])
+        elif medicao["tipo"] == "execucao":
+            registro.incrementar("cronograma_execucoes_total", resultado=medicao["resultado"])
+
+
+def rss_atual_bytes():
+    """RSS atual do processo (Linux, via /proc); None onde não há /proc."""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def rss_pico_bytes():
+    """Pico de RSS do processo desde o início (o CBC roda em outro processo e não entra na conta)."""
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return uso.ru_maxrss if sys.platform == "darwin" else uso.ru_maxrss * 1024
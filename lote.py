@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from cache import cache_padrao, hash_conteudo
+from ingestao import ler_disponibilidade, validar_planilha
+from instrumentacao import publicar
+from pipeline import (
+    ErroPipeline, chave_aba, executar_pipeline_isolado, extrair_entradas_cache, incorporar_saida_isolada
+)
+
+# --- Configuração (variáveis de ambiente) ---
+# Processos que resolvem cenários de lotes ao mesmo tempo (compartilhados por todas as requisições)
+MAX_PROCESSOS_LOTE = int(os.environ.get("CRONOGRAMA_MAX_PROCESSOS_LOTE", max(1, (os.cpu_count() or 2) // 2)))
+# Número máximo de cenários aceitos num lote
+MAX_CENARIOS = int(os.environ.get("CRONOGRAMA_MAX_CENARIOS", 50))
+
+_executor = None
+_trava = threading.Lock()
+
+
+def executor_lote():
+    """Pool de processos dos lotes, criado no primeiro uso."""
+    global _executor
+    with _trava:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=MAX_PROCESSOS_LOTE, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def encerrar():
+    """Descarta os cenários ainda na fila e libera os processos (desligamento da API)."""
+    global _executor
+    with _trava:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def validar_cenarios(conteudo_arquivo, lista_parametros, cache=None):
+    """
+    Confere as abas e os cabeçalhos das equipes de cada cenário (`validar_planilha`).
+    Devolve, na ordem dos cenários, a mensagem dos problemas encontrados ou None.
+    Cenários cujas abas já estão no cache não são verificados de novo.
+    """
+    if cache is None:
+        cache = cache_padrao
+    chave_arquivo = hash_conteudo(conteudo_arquivo)
+    problemas = {}
+    for parametros in lista_parametros:
+        equipes = tuple(parametros["equipes"])
+        if equipes in problemas:
+            continue
+        problemas[equipes] = None
+        if not all(cache.contem(chave_aba(chave_arquivo, equipe)) for equipe in equipes):
+            try:
+                validar_planilha(conteudo_arquivo, equipes)
+            except ValueError as e:
+                problemas[equipes] = str(e)
+    return [problemas[tuple(parametros["equipes"])] for parametros in lista_parametros]
+
+
+def preparar_abas(conteudo_arquivo, equipes, cache=None):
+    """
+    Lê de uma vez, para o cache, as abas de todas as equipes dos cenários que ainda
+    não estão nele. Uma aba que passa na validação mas não pode ser lida (ex.: datas
+    inválidas) não impede as outras: o cenário que depende dela falha sozinho, com a
+    mensagem da própria leitura.
+    """
+    if cache is None:
+        cache = cache_padrao
+    chave_arquivo = hash_conteudo(conteudo_arquivo)
+    faltantes = [equipe for equipe in dict.fromkeys(equipes) if cache.obter(chave_aba(chave_arquivo, equipe)) is None]
+    if not faltantes:
+        return
+
+    try:
+        lidas = ler_disponibilidade(conteudo_arquivo, faltantes)
+    except Exception:
+        lidas = {}
+        for equipe in faltantes:
+            try:
+                lidas.update(ler_disponibilidade(conteudo_arquivo, [equipe]))
+            except Exception:
+                continue
+
+    for equipe, df_aba in lidas.items():
+        cache.guardar(chave_aba(chave_arquivo, equipe), df_aba)
+
+
+def submeter_cenarios(lista_parametros, conteudo_arquivo, id_requisicao=None, cache=None, executor=None):
+    """
+    Prepara as abas compartilhadas e submete um pipeline isolado por cenário ao pool.
+    Cada cenário leva as entradas do cache que aproveita (abas ou matriz já prontas).
+    Devolve os futuros na ordem dos cenários.
+    """
+    if cache is None:
+        cache = cache_padrao
+    preparar_abas(conteudo_arquivo, [equipe for parametros in lista_parametros for equipe in parametros["equipes"]], cache)
+    if executor is None:
+        executor = executor_lote()
+    return [
+        executor.submit(executar_pipeline_isolado, parametros, conteudo_arquivo,
+                        extrair_entradas_cache(parametros, conteudo_arquivo, cache), id_requisicao, MAX_PROCESSOS_LOTE)
+        for parametros in lista_parametros
+    ]
+
+
+def resultado_cenario(futuro, cache=None):
+    """
+    Entrada do lote para um cenário já concluído: {"status": 200, "resultado": ...}
+    ou {"status": <código>, "detail": <mensagem>}, como a resposta do endpoint único.
+    """
+    global _executor
+    try:
+        saida = futuro.result()
+    except ErroPipeline as e:
+        publicar(e.medicoes)
+        return {"status": e.status_code, "detail": e.detail}
+    except BrokenProcessPool:
+        # Um processo morreu (ex.: falta de memória): o próximo lote começa com um pool novo.
+        # Outra requisição pode já ter trocado o pool; só o quebrado é encerrado
+        with _trava:
+            if _executor is not None and _executor._broken:
+                _executor.shutdown(wait=False)
+                _executor = None
+        return {"status": 500, "detail": "O processo que resolvia o cenário foi encerrado inesperadamente."}
+    except Exception as e:
+        return {"status": 500, "detail": f"Ocorreu um erro interno no servidor: {e}"}
+    return {"status": 200, "resultado": incorporar_saida_isolada(saida, cache)}
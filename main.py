@@ -1,21 +1,39 @@
-import pandas as pd
+import asyncio
 import json
+import logging
+import time
+import uuid
 from fastapi import FastAPI, Form, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import tempfile
 import os
-import io
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, List
 
 # Importe as suas funções refatoradas
-from criar_sessoes import criar_sessoes
-from criar_matriz import criar_matriz
-from otimizador import otimizar_cronograma
+from cache import cache_padrao, hash_conteudo
+from ingestao import nomes_abas as ler_nomes_abas, validar_planilha
+from instrumentacao import (
+    Instrumentacao, configurar_logs, id_requisicao, publicar, registrar_evento, registro_padrao, rss_pico_bytes
+)
+import lote
+from otimizador import MODOS
+from relatorio import escrever_relatorio_temporario, ler_em_partes
+from reotimizacao import TEMPO_LIMITE_REOTIMIZACAO, criar_cronograma, repositorio_padrao
+from solvers import SOLVERS
+from pipeline import (
+    ErroPipeline, chave_aba, executar_pipeline, executar_pipeline_isolado, extrair_entradas_cache, incorporar_saida_isolada
+)
+from tarefas import CANCELADA, CONCLUIDA, ESTADOS_FINAIS, FALHOU, FilaCheiaError, GerenciadorTarefas
+from uploads import UploadGrandeError, receber_upload, verificar_bytes_recebidos, verificar_tamanho_requisicao
 
 # Inicializa a aplicação FastAPI
 app = FastAPI()
+configurar_logs()
+
+# Execução das tarefas em processos separados (configurável por variáveis de ambiente)
+gerenciador_tarefas = GerenciadorTarefas()
 
 # --- Configuração do CORS ---
 origins = [
@@ -30,20 +48,150 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# --- Limite de tamanho: recusa pelo Content-Length antes de receber o corpo e, sem ele, contando os bytes ---
+class LimitarTamanhoRequisicao:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length")
+        try:
+            verificar_tamanho_requisicao(content_length.decode("latin-1") if content_length else None)
+        except UploadGrandeError as e:
+            await JSONResponse(status_code=413, content={"detail": str(e)})(scope, receive, send)
+            return
+
+        recebidos = 0
+
+        async def receber_com_limite():
+            nonlocal recebidos
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+                try:
+                    verificar_bytes_recebidos(recebidos)
+                except UploadGrandeError as e:
+                    # HTTPException atravessa a leitura do formulário no FastAPI (outros erros viram 400)
+                    raise HTTPException(status_code=413, detail=str(e))
+            return mensagem
+
+        await self.app(scope, receber_com_limite, send)
+
+
+app.add_middleware(LimitarTamanhoRequisicao)
+
+
+# --- Instrumentação: id da requisição, métricas e log de cada requisição ---
+@app.middleware("http")
+async def instrumentar_requisicao(request, call_next):
+    identificador = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = id_requisicao.set(identificador)
+    inicio = time.perf_counter()
+    status = 500
+    try:
+        resposta = await call_next(request)
+        status = resposta.status_code
+        resposta.headers["X-Request-ID"] = identificador
+        return resposta
+    finally:
+        duracao = time.perf_counter() - inicio
+        # O caminho com parâmetros ({id_tarefa}) mantém poucas séries por rota
+        rota = getattr(request.scope.get("route"), "path", "nao_encontrada")
+        registro_padrao.incrementar("cronograma_requisicoes_total", rota=rota, metodo=request.method, status=status)
+        registro_padrao.observar("cronograma_requisicao_duracao_segundos", duracao, rota=rota)
+        registrar_evento("requisicao", rota=rota, metodo=request.method, status=status, duracao_segundos=round(duracao, 4))
+        id_requisicao.reset(token)
+
 # --- ENDPOINT PARA OBTER NOMES DAS ABAS ---
 @app.post("/api/obter-nomes-abas")
 async def obter_nomes_abas_endpoint(arquivo: UploadFile = File(...)):
+    fonte = await _receber_arquivo(arquivo)
     try:
-        contents = await arquivo.read()
-        excel_file = pd.ExcelFile(contents)
-        return excel_file.sheet_names
+        chave = ("abas", hash_conteudo(fonte))
+        nomes_abas = cache_padrao.obter(chave)
+        if nomes_abas is None:
+            nomes_abas = ler_nomes_abas(fonte)
+            cache_padrao.guardar(chave, nomes_abas)
+        return nomes_abas
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Não foi possível processar o arquivo. Verifique se é um arquivo Excel (.xlsx) válido. Erro: {e}"
         )
+    finally:
+        fonte.close()
+
+
+async def _receber_arquivo(arquivo):
+    """Arquivo do upload (em memória ou disco), com o limite de tamanho (413)."""
+    try:
+        return receber_upload(arquivo)
+    except UploadGrandeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+async def _receber_planilha(arquivo, equipes):
+    """
+    Recebe o upload e, antes de qualquer leitura completa, confere abas e cabeçalhos
+    das equipes (400 com todos os problemas). Arquivos cujas abas já estão no cache
+    foram lidos antes e não são verificados de novo. Quem chama fecha o arquivo.
+    """
+    fonte = await _receber_arquivo(arquivo)
+    try:
+        chave_arquivo = await run_in_threadpool(hash_conteudo, fonte)
+        if not all(cache_padrao.contem(chave_aba(chave_arquivo, equipe)) for equipe in equipes):
+            await run_in_threadpool(validar_planilha, fonte, equipes)
+    except ValueError as e:
+        fonte.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        fonte.close()
+        raise
+    # A validação (openpyxl) deixa o arquivo no meio; quem lê os bytes espera o início
+    fonte.seek(0)
+    return fonte
 
 # --- ENDPOINT PRINCIPAL PARA GERAR O CRONOGRAMA ---
+def _ler_parametros(data_inicio_str, data_fim_str, dias_da_semana_json, horarios_inicio_list_str,
+                    duracao_sessao_horas, capacidade_padrao, equipes_str, modo="otimo", solver=None, capacidades_json=None):
+    """
+    Converte os campos do formulário no dicionário de parâmetros do pipeline.
+    `capacidades_json` é um objeto {sessão ou horário 'HH:MM': capacidade} que
+    substitui `capacidade_padrao` nessas sessões.
+    """
+    try:
+        dias_da_semana = json.loads(dias_da_semana_json)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"dias_da_semana_json inválido: {e}")
+    try:
+        capacidades_sessoes = json.loads(capacidades_json) if capacidades_json else {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"capacidades_json inválido: {e}")
+    if not isinstance(capacidades_sessoes, dict):
+        raise HTTPException(status_code=400, detail="capacidades_json inválido: use um objeto {sessão ou 'HH:MM': capacidade}.")
+    if modo not in MODOS:
+        raise HTTPException(status_code=400, detail=f"modo inválido: '{modo}'. Use um de {list(MODOS)}.")
+    if solver is not None and solver not in SOLVERS:
+        raise HTTPException(status_code=400, detail=f"solver inválido: '{solver}'. Use um de {list(SOLVERS)}.")
+
+    return {
+        "data_inicio_str": data_inicio_str,
+        "data_fim_str": data_fim_str,
+        "dias_da_semana": dias_da_semana,
+        "horarios_inicio_list": [h.strip() for h in horarios_inicio_list_str.split(',')],
+        "duracao_sessao_horas": duracao_sessao_horas,
+        "capacidade_padrao": capacidade_padrao,
+        "equipes": [e.strip() for e in equipes_str.split(',')],
+        "modo": modo,
+        "solver": solver,
+        "capacidades_sessoes": capacidades_sessoes,
+    }
+
+
 @app.post("/api/gerar-cronograma")
 async def gerar_cronograma_endpoint(
     data_inicio_str: str = Form(...),
@@ -53,57 +201,310 @@ async def gerar_cronograma_endpoint(
     duracao_sessao_horas: int = Form(...),
     capacidade_padrao: int = Form(...),
     equipes_str: str = Form(...),
+    modo: str = Form("otimo"),
+    solver: str = Form(None),
+    capacidades_json: str = Form(None),
     arquivo: UploadFile = File(...)
 ):
+    # --- ETAPA 0: Processar os inputs recebidos ---
+    parametros = _ler_parametros(
+        data_inicio_str, data_fim_str, dias_da_semana_json, horarios_inicio_list_str,
+        duracao_sessao_horas, capacidade_padrao, equipes_str, modo, solver, capacidades_json
+    )
+    registrar_evento("parametros_recebidos", logging.DEBUG, dias_da_semana=parametros["dias_da_semana"])
+    fonte = await _receber_planilha(arquivo, parametros["equipes"])
+
+    # As etapas são síncronas e pesadas: rodam numa thread para não bloquear o event loop
     try:
-        
-        # --- ETAPA 0: Processar os inputs recebidos ---
-        dias_da_semana = json.loads(dias_da_semana_json)
-        horarios_inicio_list = [h.strip() for h in horarios_inicio_list_str.split(',')]
-        equipes_para_processar = [e.strip() for e in equipes_str.split(',')]
-        # --- PASSO 1 DE DEPURAÇÃO: Imprimir os valores recebidos ---
-        print("-----------------------------------------")
-        print(f"DEBUG: Dias da semana recebidos do frontend (padrão Pandas esperado): {dias_da_semana}")
-        print("-----------------------------------------")
-        # -----------------------------------------
-
-        # --- ETAPA 1: Gerar Sessões ---
-        df_sessoes = criar_sessoes(
-            data_inicio_str, data_fim_str, dias_da_semana, horarios_inicio_list,
-            duracao_sessao_horas, capacidade_padrao
+        return await run_in_threadpool(executar_pipeline, parametros, fonte)
+    except ErroPipeline as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        fonte.close()
+
+
+# --- TAREFAS ASSÍNCRONAS (submissão, status, progresso, resultado e cancelamento) ---
+@app.post("/api/tarefas/gerar-cronograma", status_code=202)
+async def submeter_cronograma_endpoint(
+    data_inicio_str: str = Form(...),
+    data_fim_str: str = Form(...),
+    dias_da_semana_json: str = Form(...),
+    horarios_inicio_list_str: str = Form(...),
+    duracao_sessao_horas: int = Form(...),
+    capacidade_padrao: int = Form(...),
+    equipes_str: str = Form(...),
+    modo: str = Form("otimo"),
+    solver: str = Form(None),
+    capacidades_json: str = Form(None),
+    arquivo: UploadFile = File(...)
+):
+    parametros = _ler_parametros(
+        data_inicio_str, data_fim_str, dias_da_semana_json, horarios_inicio_list_str,
+        duracao_sessao_horas, capacidade_padrao, equipes_str, modo, solver, capacidades_json
+    )
+    # Os bytes seguem para o processo da tarefa
+    with await _receber_planilha(arquivo, parametros["equipes"]) as fonte:
+        conteudo = fonte.read()
+
+    # As abas e a matriz já conhecidas seguem para o processo da tarefa; as novas voltam para o cache
+    entradas_cache = extrair_entradas_cache(parametros, conteudo)
+    try:
+        tarefa = gerenciador_tarefas.submeter(
+            executar_pipeline_isolado, parametros, conteudo, entradas_cache, id_requisicao.get(),
+            gerenciador_tarefas.max_concorrencia, ao_concluir=incorporar_saida_isolada
         )
-        if not isinstance(df_sessoes, pd.DataFrame) or df_sessoes.empty:
-            raise HTTPException(status_code=400, detail="Nenhuma sessão pôde ser gerada com os parâmetros fornecidos.")
-
-        # --- ETAPA 2: Criar Matriz ---
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as temp_file:
-            temp_file.write(await arquivo.read())
-            temp_file_path = temp_file.name
-
-        df_matriz = criar_matriz(df_sessoes, equipes_para_processar, temp_file_path)
-        os.unlink(temp_file_path)
-
-        if df_matriz.empty:
-            raise HTTPException(status_code=400, detail="Matriz de disponibilidade não pôde ser criada. Verifique o arquivo Excel e os nomes das equipes.")
-
-        # --- ETAPA 3: Otimizar Cronograma ---
-        # A função otimizador_cronograma agora trata os seus próprios erros.
-        # A verificação de 'status' foi removida porque já não é necessária.
-        resultado = otimizar_cronograma(df_sessoes, df_matriz)
-        
-        # Se a otimização devolver um resultado vazio, informamos o utilizador.
-        if not resultado:
-             raise HTTPException(status_code=500, detail="A otimização retornou um resultado vazio.")
-
-        return resultado
-
-    except ValueError as ve:
-        # Captura o erro específico que criámos no otimizador
-        raise HTTPException(status_code=500, detail=f"Erro na otimização: {str(ve)}")
-    except Exception as e:
-        # Captura qualquer outro erro inesperado
-        raise HTTPException(status_code=500, detail=f"Ocorreu um erro interno no servidor: {str(e)}")
-    
+    except FilaCheiaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return tarefa.resumo()
+
+
+def _obter_tarefa(id_tarefa):
+    tarefa = gerenciador_tarefas.obter(id_tarefa)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada ou expirada.")
+    return tarefa
+
+
+@app.get("/api/tarefas/{id_tarefa}")
+async def status_tarefa_endpoint(id_tarefa: str):
+    return _obter_tarefa(id_tarefa).resumo()
+
+
+@app.get("/api/tarefas/{id_tarefa}/resultado")
+async def resultado_tarefa_endpoint(id_tarefa: str):
+    tarefa = _obter_tarefa(id_tarefa)
+    if tarefa.estado == CONCLUIDA:
+        return tarefa.resultado
+    if tarefa.estado == FALHOU:
+        raise HTTPException(status_code=tarefa.erro["status_code"], detail=tarefa.erro["detail"])
+    if tarefa.estado == CANCELADA:
+        raise HTTPException(status_code=410, detail="A tarefa foi cancelada.")
+    raise HTTPException(status_code=409, detail=f"A tarefa ainda não terminou (estado: {tarefa.estado}).")
+
+
+@app.get("/api/tarefas/{id_tarefa}/progresso")
+async def progresso_tarefa_endpoint(id_tarefa: str):
+    """Transmite o progresso da tarefa como Server-Sent Events até ela terminar."""
+    tarefa = _obter_tarefa(id_tarefa)
+
+    async def eventos():
+        enviados = 0
+        while True:
+            novos = tarefa.progresso[enviados:]
+            for evento in novos:
+                yield f"event: progresso\ndata: {json.dumps(evento)}\n\n"
+            enviados += len(novos)
+            if tarefa.estado in ESTADOS_FINAIS:
+                yield f"event: fim\ndata: {json.dumps(tarefa.resumo())}\n\n"
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(eventos(), media_type="text/event-stream")
+
+
+@app.delete("/api/tarefas/{id_tarefa}")
+async def cancelar_tarefa_endpoint(id_tarefa: str):
+    _obter_tarefa(id_tarefa)
+    return gerenciador_tarefas.cancelar(id_tarefa).resumo()
+
+
+# --- LOTES DE CENÁRIOS (um arquivo, vários conjuntos de parâmetros) ---
+CAMPOS_CENARIO = ("data_inicio_str", "data_fim_str", "dias_da_semana_json", "horarios_inicio_list_str",
+                  "duracao_sessao_horas", "capacidade_padrao", "equipes_str")
+
+
+def _ler_cenarios(cenarios_json):
+    """
+    Converte `cenarios_json` em [(nome, parâmetros)]. Cada cenário é um objeto com os
+    campos do formulário de /api/gerar-cronograma (listas e objetos podem vir como
+    JSON em vez de texto) e um 'nome' opcional.
+    """
+    try:
+        cenarios = json.loads(cenarios_json)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"cenarios_json inválido: {e}")
+    if not isinstance(cenarios, list) or not cenarios or not all(isinstance(c, dict) for c in cenarios):
+        raise HTTPException(status_code=400, detail="cenarios_json inválido: use uma lista não vazia de objetos.")
+    if len(cenarios) > lote.MAX_CENARIOS:
+        raise HTTPException(status_code=400, detail=f"Número de cenários acima do limite ({lote.MAX_CENARIOS}).")
+
+    lidos = []
+    for i, cenario in enumerate(cenarios):
+        nome = str(cenario.get("nome", f"cenario_{i + 1}"))
+        ausentes = [campo for campo in CAMPOS_CENARIO if campo not in cenario]
+        if ausentes:
+            raise HTTPException(status_code=400, detail=f"Cenário '{nome}': campo(s) ausente(s): {', '.join(ausentes)}")
+        valores = dict(cenario)
+        for campo in ("dias_da_semana_json", "capacidades_json"):
+            if campo in valores and not isinstance(valores[campo], str):
+                valores[campo] = json.dumps(valores[campo])
+        for campo in ("horarios_inicio_list_str", "equipes_str"):
+            if isinstance(valores[campo], list):
+                valores[campo] = ",".join(str(v) for v in valores[campo])
+        try:
+            for campo in ("duracao_sessao_horas", "capacidade_padrao"):
+                valores[campo] = int(valores[campo])
+            parametros = _ler_parametros(
+                *(valores[campo] for campo in CAMPOS_CENARIO),
+                valores.get("modo", "otimo"), valores.get("solver"), valores.get("capacidades_json")
+            )
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Cenário '{nome}': valor inválido: {e}")
+        except HTTPException as e:
+            raise HTTPException(status_code=400, detail=f"Cenário '{nome}': {e.detail}")
+        lidos.append((nome, parametros))
+    return lidos
+
+
+@app.post("/api/lotes/gerar-cronograma")
+async def gerar_lote_endpoint(
+    cenarios_json: str = Form(...),
+    arquivo: UploadFile = File(...)
+):
+    """
+    Gera um cronograma por cenário sobre o mesmo arquivo. As abas são lidas uma vez
+    e os cenários rodam em paralelo no pool de processos dos lotes. A resposta é
+    NDJSON: uma linha por cenário, na ordem em que terminam, com índice, nome,
+    status e o resultado (ou 'detail' em caso de erro). Cenários com abas ausentes
+    ou malformadas recebem logo uma linha com status 400; os demais rodam.
+    """
+    cenarios = _ler_cenarios(cenarios_json)
+    with await _receber_arquivo(arquivo) as fonte:
+        conteudo = fonte.read()
+    lista_parametros = [parametros for _, parametros in cenarios]
+    problemas = await run_in_threadpool(lote.validar_cenarios, conteudo, lista_parametros)
+    validos = [i for i, problema in enumerate(problemas) if problema is None]
+    futuros = {}
+    if validos:
+        futuros = dict(zip(validos, await run_in_threadpool(
+            lote.submeter_cenarios, [lista_parametros[i] for i in validos], conteudo, id_requisicao.get()
+        )))
+
+    async def aguardar(indice):
+        await asyncio.wait([asyncio.wrap_future(futuros[indice])])
+        return indice
+
+    def linha(indice, entrada):
+        return json.dumps({"indice": indice, "nome": cenarios[indice][0], **entrada}, ensure_ascii=False) + "\n"
+
+    async def linhas():
+        try:
+            for indice, problema in enumerate(problemas):
+                if problema is not None:
+                    yield linha(indice, {"status": 400, "detail": problema})
+            for proximo in asyncio.as_completed([aguardar(i) for i in futuros]):
+                indice = await proximo
+                yield linha(indice, lote.resultado_cenario(futuros[indice]))
+        finally:
+            # Cliente desconectado: os cenários que ainda não começaram são descartados
+            for futuro in futuros.values():
+                futuro.cancel()
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
+
+
+@app.get("/api/cache")
+async def estatisticas_cache_endpoint():
+    return cache_padrao.estatisticas()
+
+
+@app.get("/metrics")
+async def metricas_endpoint():
+    """Métricas no formato de texto do Prometheus."""
+    estatisticas = cache_padrao.estatisticas()
+    registro_padrao.definir("cronograma_processo_rss_pico_bytes", rss_pico_bytes())
+    registro_padrao.definir("cronograma_cache_itens", estatisticas["itens"])
+    registro_padrao.definir("cronograma_cache_bytes", estatisticas["bytes_usados"])
+    registro_padrao.definir("cronograma_cache_consultas_total", estatisticas["acertos"], resultado="acerto")
+    registro_padrao.definir("cronograma_cache_consultas_total", estatisticas["falhas"], resultado="falha")
+    return PlainTextResponse(registro_padrao.exportar(), media_type="text/plain; version=0.0.4")
+
+
+# --- REOTIMIZAÇÃO INCREMENTAL (cronogramas mantidos em memória por id) ---
+class ParDisponibilidade(BaseModel):
+    pessoa: str
+    sessao: str
+
+class DeltaCronograma(BaseModel):
+    adicionar_disponibilidade: List[ParDisponibilidade] = []
+    remover_disponibilidade: List[ParDisponibilidade] = []
+    capacidades: Dict[str, int] = {}
+    remover_sessoes: List[str] = []
+    remover_datas: List[str] = []
+    fixar_nao_afetados: bool = True
+    tempo_limite_segundos: int = Field(TEMPO_LIMITE_REOTIMIZACAO, gt=0)
+
+
+@app.post("/api/cronogramas")
+async def criar_cronograma_endpoint(
+    data_inicio_str: str = Form(...),
+    data_fim_str: str = Form(...),
+    dias_da_semana_json: str = Form(...),
+    horarios_inicio_list_str: str = Form(...),
+    duracao_sessao_horas: int = Form(...),
+    capacidade_padrao: int = Form(...),
+    equipes_str: str = Form(...),
+    modo: str = Form("otimo"),
+    solver: str = Form(None),
+    capacidades_json: str = Form(None),
+    arquivo: UploadFile = File(...)
+):
+    """Gera o cronograma como /api/gerar-cronograma e o guarda para reotimizações (devolve `id_cronograma`)."""
+    parametros = _ler_parametros(
+        data_inicio_str, data_fim_str, dias_da_semana_json, horarios_inicio_list_str,
+        duracao_sessao_horas, capacidade_padrao, equipes_str, modo, solver, capacidades_json
+    )
+    fonte = await _receber_planilha(arquivo, parametros["equipes"])
+
+    try:
+        return await run_in_threadpool(criar_cronograma, parametros, fonte)
+    except ErroPipeline as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        fonte.close()
+
+
+def _obter_cronograma(id_cronograma):
+    modelo = repositorio_padrao.obter(id_cronograma)
+    if modelo is None:
+        raise HTTPException(status_code=404, detail="Cronograma não encontrado ou descartado.")
+    return modelo
+
+
+@app.get("/api/cronogramas/{id_cronograma}")
+async def obter_cronograma_endpoint(id_cronograma: str):
+    return dict(_obter_cronograma(id_cronograma).resultado(), id_cronograma=id_cronograma)
+
+
+@app.post("/api/cronogramas/{id_cronograma}/reotimizar")
+async def reotimizar_cronograma_endpoint(id_cronograma: str, delta: DeltaCronograma):
+    modelo = _obter_cronograma(id_cronograma)
+    instrumentacao = Instrumentacao()
+    try:
+        with instrumentacao.etapa("reotimizacao"):
+            resultado = await run_in_threadpool(
+                modelo.reotimizar, delta.model_dump(), delta.tempo_limite_segundos, delta.fixar_nao_afetados
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        publicar(instrumentacao.medicoes)
+    return dict(resultado, id_cronograma=id_cronograma)
+
+
+@app.delete("/api/cronogramas/{id_cronograma}")
+async def remover_cronograma_endpoint(id_cronograma: str):
+    if not repositorio_padrao.remover(id_cronograma):
+        raise HTTPException(status_code=404, detail="Cronograma não encontrado ou descartado.")
+    return {"id_cronograma": id_cronograma, "removido": True}
+
+
+@app.on_event("shutdown")
+def encerrar_tarefas():
+    gerenciador_tarefas.encerrar()
+    lote.encerrar()
+
 # --- Modelos Pydantic para validar os dados do relatório ---
 class SessaoAgendada(BaseModel):
     nome_sessao: str
@@ -121,68 +522,15 @@ class ResultadoRelatorio(BaseModel):
 
 @app.post("/api/criar-relatorio-excel")
 async def criar_relatorio_excel_endpoint(resultado: ResultadoRelatorio):
-    output = io.BytesIO()
-
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        workbook = writer.book
-
-        title_format = workbook.add_format({'bold': True, 'font_size': 16, 'font_color': '#002D5B', 'valign': 'vcenter'})
-        header_format = workbook.add_format({'bold': True, 'fg_color': '#002D5B', 'font_color': 'white', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
-        bold_format = workbook.add_format({'bold': True})
-        alert_header_format = workbook.add_format({'bold': True, 'fg_color': '#FFC7CE', 'font_color': '#9C0006', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
-
-        # --- ABA DE RESUMO GERAL ---
-        resumo_data = []
-        for s in resultado.sessoes_agendadas:
-            resumo_data.append({
-                'Sessão': s.nome_sessao,
-                'Data': pd.to_datetime(s.data_evento).strftime('%d/%m/%Y'),
-                'Horário': f"{s.hora_inicio} - {s.hora_fim}",
-                'Nº de Participantes': s.quantidade_pessoas
-            })
-        
-        df_resumo = pd.DataFrame(resumo_data)
-        df_resumo.to_excel(writer, sheet_name='Resumo_Geral', startrow=2, index=False)
-        
-        resumo_sheet = writer.sheets['Resumo_Geral']
-        resumo_sheet.write('A1', 'Resumo do Cronograma Otimizado', title_format)
-        
-        for col_num, value in enumerate(df_resumo.columns.values):
-            resumo_sheet.write(2, col_num, value, header_format)
-            
-        for i, col in enumerate(df_resumo.columns):
-            column_len = max(df_resumo[col].astype(str).str.len().max(), len(col)) + 2
-            resumo_sheet.set_column(i, i, column_len)
-
-        # --- ADICIONA A LISTA DE NÃO ALOCADOS AO RESUMO ---
-        if resultado.pessoas_nao_alocadas:
-            start_row = len(df_resumo) + 6
-            resumo_sheet.write(start_row, 0, 'Pessoas Não Alocadas', alert_header_format)
-            df_nao_alocados = pd.DataFrame({'Nome': resultado.pessoas_nao_alocadas})
-            df_nao_alocados.to_excel(writer, sheet_name='Resumo_Geral', startrow=start_row + 1, index=False, header=False)
-            resumo_sheet.set_column(0, 0, 40)
-
-
-        # --- ABAS DETALHADAS PARA CADA SESSÃO ---
-        for sessao in resultado.sessoes_agendadas:
-            sheet_name = sessao.nome_sessao.replace(" ", "_").replace(":", "-")[:31]
-            df_participantes = pd.DataFrame({'Integrantes da Sessão': sorted(sessao.integrantes)})
-            
-            df_participantes.to_excel(writer, sheet_name=sheet_name, startrow=5, index=False)
-            
-            worksheet = writer.sheets[sheet_name]
-            
-            worksheet.write('A1', f"Detalhes da {sessao.nome_sessao}", title_format)
-            worksheet.write('A3', 'Data:', bold_format)
-            worksheet.write('B3', pd.to_datetime(sessao.data_evento).strftime('%d/%m/%Y'))
-            worksheet.write('A4', 'Horário:', bold_format)
-            worksheet.write('B4', f"{sessao.hora_inicio} - {sessao.hora_fim}")
-            worksheet.write('D3', 'Total de Participantes:', bold_format)
-            worksheet.write('E3', sessao.quantidade_pessoas)
-            
-            worksheet.write(5, 0, 'Integrantes da Sessão', header_format)
-            worksheet.set_column('A:A', 40)
-
-    output.seek(0)
-    headers = {'Content-Disposition': 'attachment; filename="cronograma_otimizado.xlsx"'}
-    return StreamingResponse(output, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    # O relatório é escrito em disco com memória constante e enviado em pedaços
+    instrumentacao = Instrumentacao()
+    try:
+        with instrumentacao.etapa("relatorio"):
+            caminho = await run_in_threadpool(escrever_relatorio_temporario, resultado.model_dump())
+    finally:
+        publicar(instrumentacao.medicoes)
+    headers = {
+        'Content-Disposition': 'attachment; filename="cronograma_otimizado.xlsx"',
+        'Content-Length': str(os.path.getsize(caminho)),
+    }
+    return StreamingResponse(ler_em_partes(caminho), headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
@@ -1,21 +1,530 @@
-import pandas as pd
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pulp
 
-def otimizar_cronograma(df_sessoes, df_matriz, tempo_limite_segundos=120):
+from criar_sessoes import tabela_sessoes
+from heuristica import alocacao_gulosa, limite_inferior
+from instancias import capturar_instancia
+from instrumentacao import registrar_evento
+from solvers import com_threads, configurar_solver, executar_solver
+
+# Número máximo de processos usados para resolver componentes independentes em paralelo
+MAX_PROCESSOS = int(os.environ.get("CRONOGRAMA_MAX_PROCESSOS_SOLVER", os.cpu_count() or 1))
+# Abaixo deste número de pares disponíveis o custo de subir processos não compensa
+PARES_MINIMOS_PARALELISMO = 20_000
+# Tempo mínimo de uma execução do solver; com menos que isso até o prazo, o componente fica com a solução gulosa
+TEMPO_MINIMO_SOLVER = 1.0
+
+# "otimo": solver MIP com a solução gulosa como ponto de partida; "heuristico": só a solução gulosa;
+# "hierarquico": como "otimo", mas em duas fases (máximo de alocados, depois mínimo de sessões)
+MODOS = ("otimo", "heuristico", "hierarquico")
+
+
+def otimizar_cronograma(df_sessoes, df_matriz, tempo_limite_segundos=120, decompor=True, max_processos=None,
+                        modo="otimo", usar_mip_start=True, solver=None, tempos_fases=None):
     """
     Função principal de otimização.
     Inclui restrições para evitar sessões sobrepostas.
+    `df_sessoes` pode ser o DataFrame de `criar_sessoes` ou uma `TabelaSessoes`.
+    O modelo é esparso: só existem variáveis de alocação para pares
+    (pessoa, sessão) marcados como disponíveis na matriz.
+
+    Com `decompor=True`, o problema é separado nas componentes conexas do grafo
+    pessoa-sessão (disponibilidade) e sessão-sessão (conflito de horário). Cada
+    componente é um subproblema independente, e as componentes grandes são
+    resolvidas em paralelo em até `max_processos` processos.
+
+    `tempo_limite_segundos` vale para a chamada inteira: os componentes dividem o
+    tempo em proporção ao número de pares disponíveis e nenhum passa do prazo
+    (ver `_resolver_subproblemas`).
+
+    Uma heurística gulosa gera uma solução viável em milissegundos. No modo "otimo"
+    ela é o ponto de partida (MIP start) do solver, se `usar_mip_start`, e a resposta
+    de reserva caso o solver não encontre nada melhor; no modo "heuristico" ela é a
+    resposta. O resultado informa a distância da heurística ao ótimo (ou a um limite inferior).
+
+    O modo "hierarquico" troca a soma ponderada por duas resoluções bem escaladas
+    (ver `resolver_em_fases`) e informa os dois objetivos em "objetivos". O tempo
+    de cada componente é dividido entre as fases na proporção de `tempos_fases`
+    ({"alocacao": s, "sessoes": s}; padrão: metade para cada). Informado, ele
+    substitui `tempo_limite_segundos`, que passa a ser a soma das duas fases.
+
+    `solver` é o nome do backend (ver `solvers.SOLVERS`) ou uma configuração
+    completa de `solvers.configurar_solver`; sem ele, vale a configuração do ambiente.
+
+    Com CRONOGRAMA_DIRETORIO_CAPTURA definido, a instância (sessões, matriz e
+    parâmetros) é gravada lá antes da resolução, para ser reproduzida depois com
+    `instancias.carregar_instancia`.
     """
-    
+    if modo not in MODOS:
+        raise ValueError(f"Modo de otimização desconhecido: '{modo}'. Use um de {MODOS}.")
+    config_solver = solver if isinstance(solver, dict) else configurar_solver(solver)
+    capturar_instancia(df_sessoes, df_matriz, {
+        "tempo_limite_segundos": tempo_limite_segundos, "decompor": decompor, "modo": modo,
+        "usar_mip_start": usar_mip_start, "solver": config_solver, "tempos_fases": tempos_fases,
+    })
+    if modo == "hierarquico" and tempos_fases:
+        tempo_limite_segundos = sum(tempos_fases.values())
+    prazo = time.time() + tempo_limite_segundos
+
+    inicio_construcao = time.perf_counter()
+
     # Extrai os nomes das sessoes e pessoas
-    sessoes = df_matriz.index.tolist()
+    todas_sessoes = df_matriz.index.tolist()
     pessoas = df_matriz.columns.tolist()
 
+    # --- 0. LISTAS DE ADJACÊNCIA (pares disponíveis) ---
+    linhas, colunas = np.nonzero(df_matriz.to_numpy())
+    pessoas_por_sessao = {}
+    for i, j in zip(linhas.tolist(), colunas.tolist()):
+        pessoas_por_sessao.setdefault(todas_sessoes[i], []).append(pessoas[j])
+
+    # Sessões sem ninguém disponível nunca podem ser abertas e ficam fora do modelo
+    sessoes = [s for s in todas_sessoes if s in pessoas_por_sessao]
+
+    # Capacidade e horários de cada sessão, por posição na tabela de sessões
+    tabela = tabela_sessoes(df_sessoes)
+    posicoes = tabela.posicoes(sessoes)
+    capacidades = dict(zip(sessoes, tabela.capacidade[posicoes].tolist()))
+
+    # --- IMPEDIR SESSÕES SOBREPOSTAS ---
+    print("Identificando sessões conflitantes...")
+    inicios, fins = tabela.inicio[posicoes], tabela.fim[posicoes]
+    grupos_conflitantes = [[sessoes[i] for i in grupo] for grupo in identificar_grupos_sobrepostos(inicios, fins)]
+    print(f"Restrições de conflito (cliques) identificadas: {len(grupos_conflitantes)}")
+
+    # --- DECOMPOSIÇÃO EM SUBPROBLEMAS INDEPENDENTES ---
+    if decompor:
+        subproblemas = decompor_problema(sessoes, pessoas, pessoas_por_sessao, capacidades, grupos_conflitantes)
+    else:
+        subproblemas = [montar_subproblema(sessoes, pessoas, pessoas_por_sessao, capacidades, grupos_conflitantes)]
+
+    # Pessoas sem nenhuma sessão disponível não entram em subproblema algum
+    pessoas_com_sessao = {p for sub in subproblemas for p in sub["pessoas"]}
+    pessoas_sem_sessao = [p for p in pessoas if p not in pessoas_com_sessao]
+    tempo_preparacao = time.perf_counter() - inicio_construcao
+    print(f"Problema dividido em {len(subproblemas)} componente(s) independente(s).")
+
+    # --- RESOLUÇÃO DOS SUBPROBLEMAS ---
+    if modo == "heuristico":
+        print("Gerando solução heurística...")
+        solucoes = [resolver_subproblema(sub, tempo_limite_segundos, modo) for sub in subproblemas]
+    else:
+        print(f"Iniciando otimização com limite de tempo de {tempo_limite_segundos} segundos...")
+        if max_processos is None:
+            max_processos = MAX_PROCESSOS
+        solucoes = _resolver_subproblemas(
+            subproblemas, prazo, max_processos, len(linhas), modo, usar_mip_start, config_solver, tempos_fases
+        )
+
+    # --- EXTRAÇÃO E FORMATAÇÃO DOS RESULTADOS ---
+    alocacoes = {}
+    pessoas_nao_alocadas = list(pessoas_sem_sessao)
+    for solucao in solucoes:
+        alocacoes.update(solucao["alocacoes"])
+        pessoas_nao_alocadas.extend(solucao["nao_alocados"])
+
+    sessoes_agendadas = formatar_sessoes_agendadas(sessoes, alocacoes, tabela)
+
+    registrar_evento("pessoas_nao_alocadas", logging.DEBUG, pessoas=pessoas_nao_alocadas)
+
+    estatisticas_modelo = {
+        "variaveis": sum(solucao["estatisticas"]["variaveis"] for solucao in solucoes),
+        "restricoes": sum(solucao["estatisticas"]["restricoes"] for solucao in solucoes),
+        "nao_nulos": sum(solucao["estatisticas"].get("nao_nulos", 0) for solucao in solucoes),
+        "restricoes_conflito": len(grupos_conflitantes),
+        "pares_disponiveis": int(len(linhas)),
+        "componentes": len(subproblemas),
+        # Componentes que ficaram com a solução gulosa porque o tempo da chamada acabou
+        "componentes_prazo_esgotado": sum(1 for solucao in solucoes if solucao["estatisticas"].get("prazo_esgotado")),
+        "tempo_construcao_segundos": round(
+            tempo_preparacao + sum(solucao["estatisticas"]["tempo_construcao_segundos"] for solucao in solucoes), 4
+        ),
+        # Soma entre os componentes (que podem ter rodado em paralelo)
+        "tempo_solver_segundos": round(sum(solucao["estatisticas"].get("tempo_solver_segundos", 0) for solucao in solucoes), 4),
+        "solver": _resumir_solver(
+            [solucao["solver"] for solucao in solucoes if solucao.get("solver")] +
+            [resumo for solucao in solucoes for resumo in (solucao.get("fases") or {}).values()]
+        ),
+    }
+
+    # --- QUALIDADE DA HEURÍSTICA ---
+    # Objetivo no formato do modelo completo: sessões + (n + 1) * não alocados
+    penalidade_nao_alocar = len(pessoas) + 1
+    sessoes_heuristica = sum(solucao["heuristica"]["sessoes"] for solucao in solucoes)
+    nao_alocados_heuristica = len(pessoas_sem_sessao) + sum(solucao["heuristica"]["nao_alocados"] for solucao in solucoes)
+    objetivo_heuristica = sessoes_heuristica + penalidade_nao_alocar * nao_alocados_heuristica
+
+    if modo == "heuristico":
+        referencia = "limite_inferior"
+        objetivo_referencia = penalidade_nao_alocar * len(pessoas_sem_sessao) + \
+            sum(solucao["heuristica"]["limite_inferior"] for solucao in solucoes)
+    else:
+        referencia = "solver"
+        objetivo_referencia = len(sessoes_agendadas) + penalidade_nao_alocar * len(pessoas_nao_alocadas)
+
+    heuristica = {
+        "sessoes_utilizadas": sessoes_heuristica,
+        "pessoas_nao_alocadas": nao_alocados_heuristica,
+        "objetivo": objetivo_heuristica,
+        "referencia": referencia,
+        "objetivo_referencia": objetivo_referencia,
+        "gap_relativo": round((objetivo_heuristica - objetivo_referencia) / objetivo_heuristica, 4) if objetivo_heuristica else 0.0,
+    }
+
+    if estatisticas_modelo["solver"] is not None:
+        estatisticas_modelo["solver"]["objetivo"] = objetivo_referencia
+
+    resultado_final = {
+        "total_sessoes_utilizadas": len(sessoes_agendadas),
+        "sessoes_agendadas": sessoes_agendadas,
+        "pessoas_nao_alocadas": sorted(pessoas_nao_alocadas),
+        "modo": modo,
+        "heuristica": heuristica,
+        "estatisticas_modelo": estatisticas_modelo
+    }
+
+    if modo == "hierarquico":
+        resultado_final["objetivos"] = {
+            "pessoas_alocadas": len(pessoas) - len(pessoas_nao_alocadas),
+            "sessoes_utilizadas": len(sessoes_agendadas),
+            "fases": {
+                fase: _resumir_solver([solucao["fases"][fase] for solucao in solucoes if solucao.get("fases")])
+                for fase in ("alocacao", "sessoes")
+            },
+        }
+
+    return resultado_final
+
+
+def formatar_sessoes_agendadas(sessoes, alocacoes, tabela):
+    """Sessões abertas, na ordem de `sessoes`, no formato da resposta da API."""
+    abertas = [s for s in sessoes if s in alocacoes]
+    posicoes = tabela.posicoes(abertas)
+    # 'AAAA-MM-DDTHH:MM' de uma vez para todas as sessões abertas
+    inicios = np.datetime_as_string(tabela.inicio[posicoes].view('datetime64[ns]'), unit='m')
+    fins = np.datetime_as_string(tabela.fim[posicoes].view('datetime64[ns]'), unit='m')
+    datas = np.datetime_as_string(tabela.data[posicoes])
+
+    sessoes_agendadas = []
+    for s, data_evento, inicio, fim in zip(abertas, datas.tolist(), inicios.tolist(), fins.tolist()):
+        integrantes = alocacoes[s]
+        sessoes_agendadas.append({
+            "nome_sessao": s,
+            "data_evento": data_evento,
+            "hora_inicio": inicio[11:16],
+            "hora_fim": fim[11:16],
+            "quantidade_pessoas": len(integrantes),
+            "integrantes": sorted(integrantes)
+        })
+
+    return sessoes_agendadas
+
+
+def montar_subproblema(sessoes, pessoas, pessoas_por_sessao, capacidades, grupos_conflitantes):
+    """Dados (serializáveis) de um subproblema de alocação."""
+    return {
+        "sessoes": sessoes,
+        "pessoas": pessoas,
+        "pessoas_por_sessao": {s: pessoas_por_sessao[s] for s in sessoes},
+        "capacidades": {s: capacidades[s] for s in sessoes},
+        "grupos_conflitantes": grupos_conflitantes,
+    }
+
+
+def decompor_problema(sessoes, pessoas, pessoas_por_sessao, capacidades, grupos_conflitantes):
+    """
+    Separa o problema nas componentes conexas do grafo em que sessões se ligam às
+    pessoas disponíveis nelas e às sessões com as quais conflitam. Componentes não
+    compartilham pessoas nem restrições, então podem ser resolvidas separadamente.
+    Pessoas sem nenhuma sessão disponível ficam de fora (não há o que decidir).
+    """
+    posicao_sessao = {s: i for i, s in enumerate(sessoes)}
+    posicao_pessoa = {p: len(sessoes) + j for j, p in enumerate(pessoas)}
+    pai = list(range(len(sessoes) + len(pessoas)))
+
+    def raiz(no):
+        while pai[no] != no:
+            pai[no] = pai[pai[no]]
+            no = pai[no]
+        return no
+
+    def unir(a, b):
+        ra, rb = raiz(a), raiz(b)
+        if ra != rb:
+            pai[rb] = ra
+
+    for s in sessoes:
+        for p in pessoas_por_sessao[s]:
+            unir(posicao_sessao[s], posicao_pessoa[p])
+    for grupo in grupos_conflitantes:
+        for s in grupo[1:]:
+            unir(posicao_sessao[grupo[0]], posicao_sessao[s])
+
+    # Agrupa mantendo a ordem original de sessões e pessoas
+    sessoes_por_componente = {}
+    for s in sessoes:
+        sessoes_por_componente.setdefault(raiz(posicao_sessao[s]), []).append(s)
+    pessoas_por_componente = {}
+    for p in pessoas:
+        r = raiz(posicao_pessoa[p])
+        if r in sessoes_por_componente:
+            pessoas_por_componente.setdefault(r, []).append(p)
+    grupos_por_componente = {}
+    for grupo in grupos_conflitantes:
+        grupos_por_componente.setdefault(raiz(posicao_sessao[grupo[0]]), []).append(grupo)
+
+    return [
+        montar_subproblema(
+            sessoes_componente, pessoas_por_componente.get(r, []), pessoas_por_sessao, capacidades,
+            grupos_por_componente.get(r, [])
+        )
+        for r, sessoes_componente in sessoes_por_componente.items()
+    ]
+
+
+def _resolver_subproblemas(subproblemas, prazo, max_processos, pares_disponiveis, modo, usar_mip_start,
+                           config_solver, tempos_fases=None):
+    """
+    Resolve os subproblemas até o `prazo` (time.time()) da chamada, em paralelo quando
+    há mais de um e o problema é grande o bastante. Sem número de threads configurado,
+    os núcleos são divididos entre os processos; em série, cada execução do solver usa todos.
+
+    O tempo é dividido em proporção ao tamanho de cada componente (pares disponíveis).
+    Em série, cada um recebe sua fração do tempo que resta, então o que sobra dos
+    rápidos passa para os seguintes; em paralelo, a fração é do tempo de todos os
+    processos. Em ambos os casos nenhum componente passa do prazo.
+    """
+    tamanhos = [_tamanho(sub) for sub in subproblemas]
+    if len(subproblemas) > 1 and max_processos > 1 and pares_disponiveis >= PARES_MINIMOS_PARALELISMO:
+        processos = min(max_processos, len(subproblemas))
+        config_solver = com_threads(config_solver, processos)
+        tempo_total = prazo - time.time()
+        # Maiores primeiro, para equilibrar a carga entre os processos
+        ordem = sorted(range(len(subproblemas)), key=lambda k: -tamanhos[k])
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            futuros = {
+                k: executor.submit(
+                    resolver_subproblema, subproblemas[k],
+                    min(tempo_total, tempo_total * processos * tamanhos[k] / sum(tamanhos)),
+                    modo, usar_mip_start, config_solver, tempos_fases, prazo
+                )
+                for k in ordem
+            }
+            return [futuros[k].result() for k in range(len(subproblemas))]
+
+    config_solver = com_threads(config_solver)
+    solucoes = []
+    tamanho_restante = sum(tamanhos)
+    for sub, tamanho in zip(subproblemas, tamanhos):
+        tempo = (prazo - time.time()) * tamanho / tamanho_restante if tamanho_restante else 0
+        solucoes.append(resolver_subproblema(sub, tempo, modo, usar_mip_start, config_solver, tempos_fases, prazo))
+        tamanho_restante -= tamanho
+    return solucoes
+
+
+def _resumir_solver(resumos):
+    """Consolida os resumos do solver dos componentes (backend, status, pior gap, limites de tempo atingidos)."""
+    if not resumos:
+        return None
+    status = {}
+    for resumo in resumos:
+        status[resumo["status"]] = status.get(resumo["status"], 0) + 1
+    gaps = [resumo["gap_relativo"] for resumo in resumos if resumo["gap_relativo"] is not None]
+    return {
+        "backend": resumos[0]["backend"],
+        "execucoes": len(resumos),
+        "status": status,
+        "gap_relativo": max(gaps) if gaps else None,
+        "limite_tempo_atingido": sum(1 for resumo in resumos if resumo["limite_tempo_atingido"]),
+    }
+
+
+def _tamanho(subproblema):
+    """Número de pares disponíveis (variáveis de alocação) do subproblema."""
+    return sum(len(pessoas) for pessoas in subproblema["pessoas_por_sessao"].values())
+
+
+def resolver_subproblema(subproblema, tempo_limite_segundos, modo="otimo", usar_mip_start=True, config_solver=None,
+                         tempos_fases=None, prazo=None):
+    """
+    Constrói e resolve o modelo de um subproblema, partindo da solução gulosa.
+    Devolve as sessões abertas com seus integrantes, as pessoas não alocadas, o
+    tamanho do modelo e o resumo da solução heurística.
+
+    O solver roda por `tempo_limite_segundos` (ao menos TEMPO_MINIMO_SOLVER), sem
+    passar do `prazo` (time.time()), se informado. Sem esse mínimo até o prazo, o
+    solver não roda e fica a solução gulosa.
+    """
+    inicio_construcao = time.perf_counter()
+    sessoes = subproblema["sessoes"]
+    pessoas = subproblema["pessoas"]
+    pessoas_por_sessao = subproblema["pessoas_por_sessao"]
+
+    # --- 0. SOLUÇÃO HEURÍSTICA ---
+    gulosa = alocacao_gulosa(subproblema)
+    resumo_heuristica = {
+        "sessoes": len(gulosa["alocacoes"]),
+        "nao_alocados": len(gulosa["nao_alocados"]),
+        "limite_inferior": limite_inferior(subproblema),
+    }
+    prazo_esgotado = prazo is not None and prazo - time.time() < TEMPO_MINIMO_SOLVER and modo != "heuristico"
+    if prazo_esgotado:
+        print(f"ALERTA: Prazo da otimização esgotado ({len(sessoes)} sessões, {len(pessoas)} pessoas). "
+              "Usando a solução heurística.")
+    if modo == "heuristico" or prazo_esgotado:
+        return {
+            "alocacoes": gulosa["alocacoes"],
+            "nao_alocados": gulosa["nao_alocados"],
+            "estatisticas": {
+                "variaveis": 0, "restricoes": 0,
+                "tempo_construcao_segundos": round(time.perf_counter() - inicio_construcao, 4),
+                "prazo_esgotado": prazo_esgotado,
+            },
+            "heuristica": resumo_heuristica,
+        }
+
+    # --- 1 a 4. CRIAÇÃO DO MODELO (variáveis, objetivo e restrições) ---
+    problema, x, y, nao_alocado = construir_modelo(subproblema)
+    penalidade_nao_alocar = len(pessoas) + 1
+
+    estatisticas = {
+        "variaveis": problema.numVariables(),
+        "restricoes": problema.numConstraints(),
+        "nao_nulos": contar_nao_nulos(problema),
+        "tempo_construcao_segundos": round(time.perf_counter() - inicio_construcao, 4),
+    }
+
+    # --- 5. RESOLUÇÃO DO PROBLEMA COM LIMITE DE TEMPO ---
+    tempo_limite_segundos = max(tempo_limite_segundos, TEMPO_MINIMO_SOLVER)
+    if prazo is not None:
+        tempo_limite_segundos = max(min(tempo_limite_segundos, prazo - time.time()), TEMPO_MINIMO_SOLVER)
+    # A solução gulosa entra como MIP start: o solver já começa com uma solução viável
+    if usar_mip_start:
+        definir_valores_iniciais(gulosa, x, y, nao_alocado)
+    if modo == "hierarquico":
+        solucao, resumos_fases = resolver_em_fases(
+            problema, subproblema, x, y, nao_alocado, gulosa, dividir_tempo_fases(tempo_limite_segundos, tempos_fases),
+            config_solver, warm_start=usar_mip_start
+        )
+        resumo_solver = None
+        estatisticas["tempo_solver_segundos"] = round(sum(r["tempo_segundos"] for r in resumos_fases.values()), 4)
+        descricao_status = ", ".join(f"{fase}: {r['status']}" for fase, r in resumos_fases.items())
+    else:
+        resumo_solver = executar_solver(problema, tempo_limite_segundos, config_solver, warm_start=usar_mip_start)
+        resumos_fases = None
+        estatisticas["tempo_solver_segundos"] = resumo_solver["tempo_segundos"]
+        solucao = ler_solucao(problema, subproblema, x, y, nao_alocado)
+        descricao_status = resumo_solver["status"]
+
+    print(f"Otimização concluída ({len(sessoes)} sessões, {len(pessoas)} pessoas). Status: {descricao_status}")
+
+    # --- 6. EXTRAÇÃO DOS RESULTADOS ---
+    # Nunca devolve algo pior que a heurística (ex.: limite de tempo atingido sem boa solução)
+    if solucao is None or _objetivo(solucao, penalidade_nao_alocar) > _objetivo(gulosa, penalidade_nao_alocar):
+        print(f"ALERTA: Solver sem solução melhor que a heurística (status {descricao_status}). "
+              "Usando a solução heurística.")
+        solucao = gulosa
+    alocacoes, nao_alocados = solucao["alocacoes"], solucao["nao_alocados"]
+
+    return {"alocacoes": alocacoes, "nao_alocados": nao_alocados, "estatisticas": estatisticas,
+            "heuristica": resumo_heuristica, "solver": resumo_solver, "fases": resumos_fases}
+
+
+def resolver_em_fases(problema, subproblema, x, y, nao_alocado, solucao_inicial, tempos_fases, config_solver=None,
+                      warm_start=True):
+    """
+    Objetivo hierárquico, no lugar da soma ponderada com penalidade grande.
+
+    Fase "alocacao": minimiza só os não alocados. Fase "sessoes": o número de não
+    alocados alcançado vira restrição e o objetivo passa a ser só as sessões
+    abertas. Cada fase tem o próprio limite de tempo (`tempos_fases`) e parte da
+    melhor solução conhecida até ali. Devolve a melhor solução encontrada (ou None)
+    e o resumo do solver de cada fase.
+    """
+    penalidade_nao_alocar = len(subproblema["pessoas"]) + 1
+    resumos = {}
+
+    # --- FASE 1: MÁXIMO DE PESSOAS ALOCADAS ---
+    problema.setObjective(pulp.lpSum(nao_alocado.values()))
+    resumos["alocacao"] = executar_solver(problema, tempos_fases["alocacao"], config_solver, warm_start=warm_start)
+    melhor = solucao_inicial
+    solucao = ler_solucao(problema, subproblema, x, y, nao_alocado)
+    if solucao is not None and len(solucao["nao_alocados"]) <= len(melhor["nao_alocados"]):
+        melhor = solucao
+
+    # --- FASE 2: MÍNIMO DE SESSÕES, SEM PERDER ALOCAÇÕES ---
+    problema += pulp.lpSum(nao_alocado.values()) <= len(melhor["nao_alocados"]), "NivelAlocacao"
+    problema.setObjective(pulp.lpSum(y.values()))
+    definir_valores_iniciais(melhor, x, y, nao_alocado)
+    resumos["sessoes"] = executar_solver(problema, tempos_fases["sessoes"], config_solver, warm_start=warm_start)
+    solucao = ler_solucao(problema, subproblema, x, y, nao_alocado)
+    if solucao is not None and _objetivo(solucao, penalidade_nao_alocar) <= _objetivo(melhor, penalidade_nao_alocar):
+        melhor = solucao
+
+    return (None if melhor is solucao_inicial else melhor), resumos
+
+
+def dividir_tempo_fases(tempo_limite_segundos, tempos_fases=None):
+    """
+    Limite de tempo de cada fase do modo hierárquico: `tempo_limite_segundos` dividido
+    na proporção de `tempos_fases` ou, sem ele, metade para cada fase.
+    """
+    if not tempos_fases:
+        return {"alocacao": tempo_limite_segundos / 2, "sessoes": tempo_limite_segundos / 2}
+    total = sum(tempos_fases.values())
+    return {fase: tempo_limite_segundos * tempos_fases[fase] / total for fase in ("alocacao", "sessoes")}
+
+
+def ler_solucao(problema, subproblema, x, y, nao_alocado):
+    """Solução nos valores das variáveis após o solver, ou None se ele não deixou nenhuma."""
+    if problema.status != pulp.LpStatusOptimal and pulp.value(problema.objective) is None:
+        return None
+    if all(v.varValue is None for v in y.values()):
+        return None
+    alocacoes, nao_alocados = extrair_solucao(
+        subproblema["sessoes"], subproblema["pessoas"], subproblema["pessoas_por_sessao"], x, y, nao_alocado
+    )
+    return {"alocacoes": alocacoes, "nao_alocados": nao_alocados}
+
+
+def _objetivo(solucao, penalidade_nao_alocar):
+    """Objetivo ponderado do modelo: sessões + penalidade x não alocados."""
+    return len(solucao["alocacoes"]) + penalidade_nao_alocar * len(solucao["nao_alocados"])
+
+
+def contar_nao_nulos(problema):
+    """Coeficientes não nulos da matriz de restrições."""
+    return sum(len(restricao) for restricao in problema.constraints.values())
+
+
+def construir_modelo(subproblema):
+    """
+    Monta o modelo esparso de um subproblema e devolve (problema, x, y, nao_alocado).
+
+    As restrições têm nome (Capacidade_i, AlocacaoMinima_i, AlocacaoUnica_j e
+    Conflito_k, com i a posição da sessão, j a da pessoa e k a do grupo) para que
+    possam ser localizadas e alteradas depois, como na reotimização incremental.
+    """
+    sessoes = subproblema["sessoes"]
+    pessoas = subproblema["pessoas"]
+    pessoas_por_sessao = subproblema["pessoas_por_sessao"]
+
     # --- 1. CRIAÇÃO DO PROBLEMA ---
     problema = pulp.LpProblem("Alocacao_de_Pessoas", pulp.LpMinimize)
 
     # --- 2. DEFINIÇÃO DAS VARIÁVEIS DE DECISÃO ---
-    x = pulp.LpVariable.dicts("Alocacao", (pessoas, sessoes), 0, 1, pulp.LpBinary)
+    posicao_pessoa = {p: j for j, p in enumerate(pessoas)}
+    x = {p: {} for p in pessoas}
+    for i, s in enumerate(sessoes):
+        for p in pessoas_por_sessao[s]:
+            x[p][s] = pulp.LpVariable(f"Alocacao_{posicao_pessoa[p]}_{i}", cat=pulp.LpBinary)
     y = pulp.LpVariable.dicts("SessaoUtilizada", sessoes, 0, 1, pulp.LpBinary)
     nao_alocado = pulp.LpVariable.dicts("NaoAlocado", pessoas, 0, 1, pulp.LpBinary)
 
@@ -25,109 +534,80 @@ def otimizar_cronograma(df_sessoes, df_matriz, tempo_limite_segundos=120):
                 penalidade_nao_alocar * pulp.lpSum(nao_alocado[p] for p in pessoas)
 
     # --- 4. DEFINIÇÃO DAS RESTRIÇÕES ---
-    
-    # Restrições de Capacidade e Alocação Mínima
-    for s in sessoes:
-        capacidade = df_sessoes.loc[df_sessoes['Sessao'] == s, 'Capacidade'].iloc[0]
-        problema += pulp.lpSum(x[p][s] for p in pessoas) <= capacidade * y[s]
-        problema += pulp.lpSum(x[p][s] for p in pessoas) >= 1 * y[s]
 
-    # Restrições de Disponibilidade
-    for p in pessoas:
-        for s in sessoes:
-            if df_matriz.loc[s, p] == 0:
-                problema += x[p][s] == 0
+    # Restrições de Capacidade e Alocação Mínima
+    for i, s in enumerate(sessoes):
+        alocados = pulp.lpSum(x[p][s] for p in pessoas_por_sessao[s])
+        problema += alocados <= subproblema["capacidades"][s] * y[s], f"Capacidade_{i}"
+        problema += alocados >= 1 * y[s], f"AlocacaoMinima_{i}"
 
     # Restrição de Alocação Única por Pessoa (relaxada)
-    for p in pessoas:
-        problema += pulp.lpSum(x[p][s] for s in sessoes) + nao_alocado[p] == 1
-        
-    # --- NOVA RESTRIÇÃO: IMPEDIR SESSÕES SOBREPOSTAS ---
-    # Mapeia o nome da sessão (string) para suas informações de tempo
-    mapa_sessoes = df_sessoes.set_index('Sessao')
-    
-    print("Identificando sessões conflitantes...")
-    conflitos_adicionados = 0
-    # Itera sobre todos os pares únicos de sessões
-    for i in range(len(sessoes)):
-        for j in range(i + 1, len(sessoes)):
-            s1_nome = sessoes[i]
-            s2_nome = sessoes[j]
-
-            s1 = mapa_sessoes.loc[s1_nome]
-            s2 = mapa_sessoes.loc[s2_nome]
-
-            # Pega os tempos de início e fim (já são datetime)
-            s1_inicio = s1['Inicio_Sessao']
-            s1_fim = s1['Fim_Sessao']
-            s2_inicio = s2['Inicio_Sessao']
-            s2_fim = s2['Fim_Sessao']
-
-            # Lógica para verificar sobreposição (max(inicios) < min(fins))
-            if max(s1_inicio, s2_inicio) < min(s1_fim, s2_fim):
-                # Se as sessões s1 e s2 se sobrepõem, elas não podem
-                # ser ativadas ao mesmo tempo.
-                problema += y[s1_nome] + y[s2_nome] <= 1
-                conflitos_adicionados += 1
-                
-    print(f"Restrições de conflito adicionadas: {conflitos_adicionados}")
-    # --------------------------------------------------------------
+    # A disponibilidade já está garantida: só existem x[p][s] para pares disponíveis.
+    for j, p in enumerate(pessoas):
+        problema += pulp.lpSum(x[p].values()) + nao_alocado[p] == 1, f"AlocacaoUnica_{j}"
 
-    # --- 5. RESOLUÇÃO DO PROBLEMA COM LIMITE DE TEMPO ---
-    print(f"Iniciando otimização com limite de tempo de {tempo_limite_segundos} segundos...")
-    
-    solver = pulp.PULP_CBC_CMD(timeLimit=tempo_limite_segundos)
-    problema.solve(solver)
-    
-    status_resolucao = problema.status
-    print(f"Otimização concluída. Status PuLP: {status_resolucao} ({pulp.LpStatus[status_resolucao]})")
-
-    # --- 6. EXTRAÇÃO E FORMATAÇÃO DOS RESULTADOS ---
-    
-    objetivo_valor = pulp.value(problema.objective)
-    solucao_encontrada = (status_resolucao == pulp.LpStatusOptimal) or \
-                         (status_resolucao == pulp.LpStatusNotSolved and objetivo_valor is not None) or \
-                         (objetivo_valor is not None) 
-
-    if not solucao_encontrada:
-        raise ValueError(f"Otimização falhou ou não encontrou solução. Status: {pulp.LpStatus[status_resolucao]}")
+    # Sessões sobrepostas: no máximo uma sessão de cada grupo pode ser ativada
+    for k, grupo in enumerate(subproblema["grupos_conflitantes"]):
+        problema += pulp.lpSum(y[s] for s in grupo) <= 1, f"Conflito_{k}"
 
-    sessoes_agendadas = []
-    
+    return problema, x, y, nao_alocado
+
+
+def extrair_solucao(sessoes, pessoas, pessoas_por_sessao, x, y, nao_alocado):
+    """Lê dos valores das variáveis as sessões abertas com seus integrantes e os não alocados."""
+    alocacoes = {}
     for s in sessoes:
-        if y[s] is not None and y[s].varValue is not None and y[s].varValue > 0.5:
-            integrantes = [p for p in pessoas if x[p][s] is not None and x[p][s].varValue is not None and x[p][s].varValue > 0.5]
-            
-            sessao_info = mapa_sessoes.loc[s]
-            
-            data_evento_dt = pd.to_datetime(sessao_info['Data do evento'])
-            hora_inicio_dt = pd.to_datetime(str(sessao_info['Hora ini']))
-            hora_fim_dt = pd.to_datetime(str(sessao_info['Hora fim']))
-
-            sessoes_agendadas.append({
-                "nome_sessao": s,
-                "data_evento": data_evento_dt.strftime('%Y-%m-%d'),
-                "hora_inicio": hora_inicio_dt.strftime('%H:%M'),
-                "hora_fim": hora_fim_dt.strftime('%H:%M'),
-                "quantidade_pessoas": len(integrantes),
-                "integrantes": sorted(integrantes)
-            })
-
-    if objetivo_valor is not None and objetivo_valor > 0 and not sessoes_agendadas:
-        print("ALERTA: Otimizador encontrou solução mas extração falhou.")
-        raise ValueError("Falha na extração dos resultados da otimização. O solver encontrou uma solução, mas o PuLP não conseguiu lê-la. Tente novamente.")
-
-    pessoas_nao_alocadas = []
-    for p in pessoas:
-        if nao_alocado[p] is not None and nao_alocado[p].varValue is not None and nao_alocado[p].varValue > 0.5:
-            pessoas_nao_alocadas.append(p)
+        if y[s].varValue is not None and y[s].varValue > 0.5:
+            alocacoes[s] = [p for p in pessoas_por_sessao[s] if x[p][s].varValue is not None and x[p][s].varValue > 0.5]
 
-    print(f"Pessoas que não puderam ser alocadas: {pessoas_nao_alocadas}")
+    nao_alocados = [p for p in pessoas if nao_alocado[p].varValue is not None and nao_alocado[p].varValue > 0.5]
+    return alocacoes, nao_alocados
 
-    resultado_final = {
-        "total_sessoes_utilizadas": int(sum(y[s].varValue for s in sessoes if y[s].varValue is not None)),
-        "sessoes_agendadas": sessoes_agendadas,
-        "pessoas_nao_alocadas": sorted(pessoas_nao_alocadas)
-    }
 
-    return resultado_final
\ No newline at end of file
+def definir_valores_iniciais(solucao, x, y, nao_alocado):
+    """Carrega uma solução (alocações e não alocados) como valores iniciais das variáveis."""
+    for s, variavel in y.items():
+        variavel.setInitialValue(1 if s in solucao["alocacoes"] else 0)
+    for variaveis_pessoa in x.values():
+        for variavel in variaveis_pessoa.values():
+            variavel.setInitialValue(0)
+    for s, integrantes in solucao["alocacoes"].items():
+        for p in integrantes:
+            x[p][s].setInitialValue(1)
+    nao_alocados = set(solucao["nao_alocados"])
+    for p, variavel in nao_alocado.items():
+        variavel.setInitialValue(1 if p in nao_alocados else 0)
+
+
+def identificar_grupos_sobrepostos(inicios, fins):
+    """
+    Encontra os grupos máximos de sessões que se sobrepõem no tempo.
+
+    Varre os inícios e fins ordenados (O(n log n)) mantendo o conjunto de sessões
+    ativas. Quando uma sessão termina logo após alguma ter começado, as ativas
+    formam um clique máximo do grafo de intervalos. Sessões que apenas se encostam
+    (fim de uma == início da outra) não são conflitantes, como na regra
+    max(inicios) < min(fins). Retorna listas de posições com pelo menos duas sessões.
+    """
+    eventos = []
+    for i, (inicio, fim) in enumerate(zip(inicios, fins)):
+        if inicio < fim:
+            # Fins (0) vêm antes de inícios (1) no mesmo instante
+            eventos.append((inicio, 1, i))
+            eventos.append((fim, 0, i))
+    eventos.sort()
+
+    grupos = []
+    ativas = set()
+    cresceu = False
+    for _, tipo, i in eventos:
+        if tipo == 1:
+            ativas.add(i)
+            cresceu = True
+        else:
+            if cresceu and len(ativas) > 1:
+                grupos.append(sorted(ativas))
+            cresceu = False
+            ativas.discard(i)
+
+    return grupos
@@ -0,0 +1,217 @@
+import time
+
+import pandas as pd
+
+from cache import CacheLRU, cache_padrao, hash_conteudo
+from criar_sessoes import aplicar_capacidades, criar_sessoes, tabela_sessoes
+from criar_matriz import montar_matriz
+from ingestao import ler_disponibilidade
+from instrumentacao import Instrumentacao, configurar_logs, id_requisicao as id_requisicao_atual, publicar
+from otimizador import otimizar_cronograma
+from solvers import definir_processos_simultaneos, otimizacao_em_andamento
+
+
+class ErroPipeline(Exception):
+    """Erro previsto do pipeline, já com o status HTTP e a mensagem para o usuário."""
+
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        # Medições feitas até o erro, quando ele ocorre no processo de uma tarefa
+        self.medicoes = []
+
+    def __reduce__(self):
+        # Atravessa processos (pool dos lotes) com as medições
+        return _recriar_erro, (self.status_code, self.detail, self.medicoes)
+
+
+def _recriar_erro(status_code, detail, medicoes):
+    erro = ErroPipeline(status_code, detail)
+    erro.medicoes = medicoes
+    return erro
+
+
+def chave_aba(chave_arquivo, equipe):
+    return ("aba", chave_arquivo, equipe)
+
+
+def chave_matriz(parametros, chave_arquivo):
+    """A matriz depende só do arquivo, das equipes e dos parâmetros que definem as sessões."""
+    return (
+        "matriz", chave_arquivo,
+        parametros["data_inicio_str"], parametros["data_fim_str"], tuple(parametros["dias_da_semana"]),
+        tuple(parametros["horarios_inicio_list"]), parametros["duracao_sessao_horas"],
+        tuple(parametros["equipes"]),
+    )
+
+
+def executar_pipeline(parametros, conteudo_arquivo, progresso=None, cache=None, instrumentacao=None):
+    """
+    Executa as etapas de geração do cronograma: sessões, matriz e otimização.
+
+    `parametros` é o dicionário montado pelo endpoint a partir do formulário (com
+    as capacidades por sessão ou horário opcionais em "capacidades_sessoes") e
+    `conteudo_arquivo` são os bytes do Excel enviado. `progresso`, se informado,
+    é chamado com o nome de cada etapa ao iniciá-la. As abas lidas e a matriz ficam
+    no `cache` (por padrão o cache compartilhado), indexadas pelo hash do arquivo.
+
+    Tempo e memória de cada etapa, tamanho do modelo e resumo do solver vão para
+    `instrumentacao`. Sem ela, as medições são publicadas nas métricas ao final.
+    """
+    return executar_pipeline_com_entradas(parametros, conteudo_arquivo, progresso, cache, instrumentacao)[2]
+
+
+def executar_pipeline_com_entradas(parametros, conteudo_arquivo, progresso=None, cache=None, instrumentacao=None):
+    """Como `executar_pipeline`, mas devolve (tabela de sessões, df_matriz, resultado)."""
+    if instrumentacao is None:
+        instrumentacao = Instrumentacao()
+        try:
+            return executar_pipeline_com_entradas(parametros, conteudo_arquivo, progresso, cache, instrumentacao)
+        finally:
+            publicar(instrumentacao.medicoes)
+
+    if cache is None:
+        cache = cache_padrao
+    inicio = time.perf_counter()
+
+    def avisar(etapa):
+        if progresso is not None:
+            progresso(etapa)
+
+    try:
+        # --- ETAPA 1: Gerar Sessões ---
+        avisar("sessoes")
+        with instrumentacao.etapa("sessoes"):
+            df_sessoes = criar_sessoes(
+                parametros["data_inicio_str"], parametros["data_fim_str"], parametros["dias_da_semana"],
+                parametros["horarios_inicio_list"], parametros["duracao_sessao_horas"], parametros["capacidade_padrao"]
+            )
+            if not isinstance(df_sessoes, pd.DataFrame) or df_sessoes.empty:
+                raise ErroPipeline(400, "Nenhuma sessão pôde ser gerada com os parâmetros fornecidos.")
+            # As etapas seguintes consultam as sessões por posição nesta tabela
+            tabela = tabela_sessoes(df_sessoes)
+            if parametros.get("capacidades_sessoes"):
+                try:
+                    aplicar_capacidades(tabela, parametros["capacidades_sessoes"])
+                except ValueError as e:
+                    raise ErroPipeline(400, f"capacidades_json inválido: {e}")
+
+        # --- ETAPA 2: Criar Matriz (ou reaproveitar do cache) ---
+        avisar("matriz")
+        chave_arquivo = hash_conteudo(conteudo_arquivo)
+        chave = chave_matriz(parametros, chave_arquivo)
+        df_matriz = cache.obter(chave)
+        if df_matriz is None:
+            df_matriz = _criar_matriz(tabela, parametros["equipes"], conteudo_arquivo, chave_arquivo, cache, instrumentacao)
+            if not df_matriz.empty:
+                cache.guardar(chave, df_matriz)
+
+        if df_matriz.empty:
+            raise ErroPipeline(400, "Matriz de disponibilidade não pôde ser criada. Verifique o arquivo Excel e os nomes das equipes.")
+
+        # --- ETAPA 3: Otimizar Cronograma ---
+        # A função otimizador_cronograma trata os seus próprios erros.
+        avisar("otimizacao")
+        with instrumentacao.etapa("otimizacao"), otimizacao_em_andamento():
+            resultado = otimizar_cronograma(
+                tabela, df_matriz, modo=parametros.get("modo", "otimo"), solver=parametros.get("solver")
+            )
+
+        # Se a otimização devolver um resultado vazio, informamos o utilizador.
+        if not resultado:
+            raise ErroPipeline(500, "A otimização retornou um resultado vazio.")
+
+        instrumentacao.registrar_otimizacao(resultado["estatisticas_modelo"])
+        instrumentacao.registrar_execucao(True, duracao_segundos=round(time.perf_counter() - inicio, 4))
+        return tabela, df_matriz, resultado
+
+    except ErroPipeline as e:
+        instrumentacao.registrar_execucao(False, status_code=e.status_code, detalhe=e.detail)
+        raise
+    except ValueError as ve:
+        # Captura o erro específico que criámos no otimizador
+        instrumentacao.registrar_execucao(False, status_code=500, detalhe=str(ve))
+        raise ErroPipeline(500, f"Erro na otimização: {str(ve)}")
+    except Exception as e:
+        # Captura qualquer outro erro inesperado
+        instrumentacao.registrar_execucao(False, status_code=500, detalhe=str(e))
+        raise ErroPipeline(500, f"Ocorreu um erro interno no servidor: {str(e)}")
+
+
+def _criar_matriz(tabela, equipes, conteudo_arquivo, chave_arquivo, cache, instrumentacao):
+    """Monta a matriz lendo do Excel apenas as abas que ainda não estão no cache."""
+    abas = {}
+    faltantes = []
+    for equipe in equipes:
+        df_aba = cache.obter(chave_aba(chave_arquivo, equipe))
+        if df_aba is None:
+            faltantes.append(equipe)
+        else:
+            abas[equipe] = df_aba
+
+    if faltantes:
+        # Lê todas as abas faltantes de uma vez, direto dos bytes enviados
+        try:
+            with instrumentacao.etapa("leitura_excel"):
+                lidas = ler_disponibilidade(conteudo_arquivo, faltantes)
+        except Exception as e:
+            raise ErroPipeline(400, f"Matriz de disponibilidade não pôde ser criada. Verifique o arquivo Excel e os nomes das equipes. {e}")
+
+        for equipe, df_aba in lidas.items():
+            cache.guardar(chave_aba(chave_arquivo, equipe), df_aba)
+        abas.update(lidas)
+
+    with instrumentacao.etapa("matriz"):
+        return montar_matriz(tabela, [abas[equipe] for equipe in equipes])
+
+
+# --- Execução em processo separado (tarefas) ---
+# O cache compartilhado vive no processo da API. Antes de submeter a tarefa, as
+# entradas úteis são copiadas para o processo filho; no fim, as entradas novas
+# voltam e são guardadas no cache compartilhado.
+
+def extrair_entradas_cache(parametros, conteudo_arquivo, cache=None):
+    """Entradas do cache que a execução de `parametros` sobre o arquivo aproveitaria."""
+    if cache is None:
+        cache = cache_padrao
+    chave_arquivo = hash_conteudo(conteudo_arquivo)
+    entradas = cache.extrair([chave_matriz(parametros, chave_arquivo)])
+    if not entradas:
+        entradas = cache.extrair([chave_aba(chave_arquivo, equipe) for equipe in parametros["equipes"]])
+    return entradas
+
+
+def executar_pipeline_isolado(parametros, conteudo_arquivo, entradas_cache, id_requisicao=None,
+                              processos_simultaneos=1, progresso=None):
+    """
+    Executa o pipeline com um cache local pré-carregado e devolve também as entradas
+    novas e as medições (publicadas nas métricas pelo processo da API).
+    `processos_simultaneos` é o tamanho do pool que executa a chamada (divide os núcleos do solver).
+    """
+    configurar_logs()
+    # Os logs do processo (otimizador, solver) levam o id da requisição que o originou
+    id_requisicao_atual.set(id_requisicao)
+    definir_processos_simultaneos(processos_simultaneos)
+    cache = CacheLRU()
+    for chave, valor in entradas_cache.items():
+        cache.guardar(chave, valor)
+
+    instrumentacao = Instrumentacao(id_requisicao)
+    try:
+        resultado = executar_pipeline(parametros, conteudo_arquivo, progresso, cache=cache, instrumentacao=instrumentacao)
+    except ErroPipeline as e:
+        e.medicoes = instrumentacao.medicoes
+        raise
+    novas = {chave: valor for chave, valor in cache.entradas().items() if chave not in entradas_cache}
+    return {"resultado": resultado, "entradas_cache": novas, "medicoes": instrumentacao.medicoes}
+
+
+def incorporar_saida_isolada(saida, cache=None):
+    """Guarda no cache as entradas produzidas no processo da tarefa, publica as medições e devolve o resultado."""
+    if cache is None:
+        cache = cache_padrao
+    for chave, valor in saida["entradas_cache"].items():
+        cache.guardar(chave, valor)
+    publicar(saida.get("medicoes", []))
+    return saida["resultado"]
@@ -0,0 +1,105 @@
+import functools
+import os
+import tempfile
+
+import pandas as pd
+import xlsxwriter
+
+# Tamanho dos pedaços enviados ao cliente ao transmitir o arquivo do relatório
+TAMANHO_PARTE = 64 * 1024
+
+COLUNAS_RESUMO = ['Sessão', 'Data', 'Horário', 'Nº de Participantes']
+
+
+def escrever_relatorio(resultado, caminho):
+    """
+    Escreve o relatório Excel do cronograma em `caminho`.
+
+    `resultado` é o dicionário devolvido pela otimização (ou pelo modelo
+    ResultadoRelatorio, já convertido). As linhas vão direto para o xlsxwriter em
+    modo `constant_memory`: cada linha é descarregada em disco assim que a próxima
+    começa, por isso tudo é escrito em ordem de linha e sem DataFrames por aba.
+    """
+    workbook = xlsxwriter.Workbook(caminho, {'constant_memory': True})
+    try:
+        title_format = workbook.add_format({'bold': True, 'font_size': 16, 'font_color': '#002D5B', 'valign': 'vcenter'})
+        header_format = workbook.add_format({'bold': True, 'fg_color': '#002D5B', 'font_color': 'white', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
+        bold_format = workbook.add_format({'bold': True})
+        alert_header_format = workbook.add_format({'bold': True, 'fg_color': '#FFC7CE', 'font_color': '#9C0006', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
+
+        sessoes = resultado["sessoes_agendadas"]
+        nao_alocados = resultado.get("pessoas_nao_alocadas") or []
+
+        # --- ABA DE RESUMO GERAL ---
+        linhas_resumo = [
+            [s["nome_sessao"], _formatar_data(s["data_evento"]), f"{s['hora_inicio']} - {s['hora_fim']}", s["quantidade_pessoas"]]
+            for s in sessoes
+        ]
+        resumo_sheet = workbook.add_worksheet('Resumo_Geral')
+        for i, coluna in enumerate(COLUNAS_RESUMO):
+            column_len = max([len(str(linha[i])) for linha in linhas_resumo] + [len(coluna)]) + 2
+            resumo_sheet.set_column(i, i, column_len)
+
+        resumo_sheet.write('A1', 'Resumo do Cronograma Otimizado', title_format)
+        resumo_sheet.write_row(2, 0, COLUNAS_RESUMO, header_format)
+        for i, linha in enumerate(linhas_resumo):
+            resumo_sheet.write_row(3 + i, 0, linha)
+
+        # --- ADICIONA A LISTA DE NÃO ALOCADOS AO RESUMO ---
+        if nao_alocados:
+            start_row = len(linhas_resumo) + 6
+            resumo_sheet.write(start_row, 0, 'Pessoas Não Alocadas', alert_header_format)
+            for i, nome in enumerate(nao_alocados):
+                resumo_sheet.write_string(start_row + 1 + i, 0, nome)
+            resumo_sheet.set_column(0, 0, 40)
+
+        # --- ABAS DETALHADAS PARA CADA SESSÃO ---
+        for sessao in sessoes:
+            sheet_name = sessao["nome_sessao"].replace(" ", "_").replace(":", "-")[:31]
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.set_column('A:A', 40)
+
+            worksheet.write('A1', f"Detalhes da {sessao['nome_sessao']}", title_format)
+            worksheet.write('A3', 'Data:', bold_format)
+            worksheet.write('B3', _formatar_data(sessao["data_evento"]))
+            worksheet.write('D3', 'Total de Participantes:', bold_format)
+            worksheet.write('E3', sessao["quantidade_pessoas"])
+            worksheet.write('A4', 'Horário:', bold_format)
+            worksheet.write('B4', f"{sessao['hora_inicio']} - {sessao['hora_fim']}")
+
+            worksheet.write(5, 0, 'Integrantes da Sessão', header_format)
+            for i, nome in enumerate(sorted(sessao["integrantes"])):
+                worksheet.write_string(6 + i, 0, nome)
+    finally:
+        workbook.close()
+
+
+def escrever_relatorio_temporario(resultado):
+    """Escreve o relatório num arquivo temporário e devolve o caminho (a remoção fica com quem chama)."""
+    descritor, caminho = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descritor)
+    try:
+        escrever_relatorio(resultado, caminho)
+    except Exception:
+        os.unlink(caminho)
+        raise
+    return caminho
+
+
+def ler_em_partes(caminho, tamanho_parte=TAMANHO_PARTE):
+    """Lê o arquivo em pedaços de `tamanho_parte` bytes e o remove ao terminar (ou se o envio for interrompido)."""
+    try:
+        with open(caminho, 'rb') as arquivo:
+            while True:
+                parte = arquivo.read(tamanho_parte)
+                if not parte:
+                    break
+                yield parte
+    finally:
+        os.unlink(caminho)
+
+
+@functools.lru_cache(maxsize=4096)
+def _formatar_data(data_evento):
+    # Muitas sessões compartilham a mesma data; o parse do pandas é o custo dominante por aba
+    return pd.to_datetime(data_evento).strftime('%d/%m/%Y')
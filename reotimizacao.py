@@ -0,0 +1,260 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pulp
+
+from criar_sessoes import tabela_sessoes
+from instrumentacao import registrar_evento
+from otimizador import (
+    construir_modelo, definir_valores_iniciais, extrair_solucao, formatar_sessoes_agendadas,
+    identificar_grupos_sobrepostos, montar_subproblema
+)
+from pipeline import executar_pipeline_com_entradas
+from solvers import configurar_solver, executar_solver, otimizacao_em_andamento
+
+# Número de cronogramas mantidos em memória para reotimização (os menos usados são descartados)
+MAX_CRONOGRAMAS = int(os.environ.get("CRONOGRAMA_MAX_CRONOGRAMAS", 20))
+# Limite de tempo padrão do solver numa reotimização
+TEMPO_LIMITE_REOTIMIZACAO = 30
+
+
+class ModeloIncremental:
+    """
+    Modelo e última solução de um cronograma, mantidos para reotimizações rápidas.
+
+    O modelo cobre todas as sessões da matriz (inclusive as sem ninguém disponível,
+    que podem ganhar disponibilidade depois) e todas as pessoas. Uma alteração
+    (delta) mexe só nas restrições envolvidas: uma variável nova nas restrições
+    da sessão e da pessoa, o coeficiente de capacidade, ou limites que desligam
+    variáveis. A nova resolução parte da solução anterior (MIP start) e, se pedido,
+    mantém fixas as alocações que a alteração não tocou. As reotimizações usam o
+    mesmo backend de solver do cronograma original.
+    """
+
+    def __init__(self, df_sessoes, df_matriz, resultado, solver=None):
+        self.trava = threading.Lock()
+        self.config_solver = configurar_solver(solver)
+        self.tabela = tabela_sessoes(df_sessoes)
+        self.sessoes = df_matriz.index.tolist()
+        self.pessoas = df_matriz.columns.tolist()
+        self.posicao_sessao = {s: i for i, s in enumerate(self.sessoes)}
+        self.posicao_pessoa = {p: j for j, p in enumerate(self.pessoas)}
+
+        linhas, colunas = np.nonzero(df_matriz.to_numpy())
+        pessoas_por_sessao = {s: [] for s in self.sessoes}
+        for i, j in zip(linhas.tolist(), colunas.tolist()):
+            pessoas_por_sessao[self.sessoes[i]].append(self.pessoas[j])
+
+        posicoes = self.tabela.posicoes(self.sessoes)
+        capacidades = dict(zip(self.sessoes, self.tabela.capacidade[posicoes].tolist()))
+        inicios, fins = self.tabela.inicio[posicoes], self.tabela.fim[posicoes]
+        grupos_conflitantes = [[self.sessoes[i] for i in grupo] for grupo in identificar_grupos_sobrepostos(inicios, fins)]
+
+        self.subproblema = montar_subproblema(self.sessoes, self.pessoas, pessoas_por_sessao, capacidades, grupos_conflitantes)
+        self.pessoas_por_sessao = self.subproblema["pessoas_por_sessao"]
+        self.capacidades = self.subproblema["capacidades"]
+        self.problema, self.x, self.y, self.nao_alocado = construir_modelo(self.subproblema)
+        self.sessoes_removidas = set()
+
+        # Solução atual, no formato {sessão: integrantes} + lista de não alocados
+        self.alocacoes = {s["nome_sessao"]: list(s["integrantes"]) for s in resultado["sessoes_agendadas"]}
+        self.nao_alocados = list(resultado["pessoas_nao_alocadas"])
+
+    # --- alterações ---
+
+    def aplicar_delta(self, delta):
+        """
+        Aplica as alterações ao modelo e devolve (sessões afetadas, pessoas afetadas).
+
+        `delta` aceita as chaves 'adicionar_disponibilidade' e 'remover_disponibilidade'
+        (listas de {'pessoa', 'sessao'}), 'capacidades' ({sessão: capacidade}),
+        'remover_sessoes' (nomes) e 'remover_datas' ('AAAA-MM-DD'). Tudo é validado
+        antes de alterar o modelo; nomes desconhecidos geram ValueError.
+        """
+        adicionar = [(par["pessoa"], par["sessao"]) for par in delta.get("adicionar_disponibilidade") or []]
+        remover = [(par["pessoa"], par["sessao"]) for par in delta.get("remover_disponibilidade") or []]
+        capacidades = delta.get("capacidades") or {}
+        remover_sessoes = list(delta.get("remover_sessoes") or [])
+        if delta.get("remover_datas"):
+            datas = {pd.to_datetime(d).strftime('%Y-%m-%d') for d in delta["remover_datas"]}
+            datas_sessoes = np.datetime_as_string(self.tabela.data[self.tabela.posicoes(self.sessoes)])
+            remover_sessoes.extend(s for s, data in zip(self.sessoes, datas_sessoes.tolist()) if data in datas)
+
+        self._validar(adicionar + remover, list(capacidades) + remover_sessoes, capacidades)
+
+        sessoes_afetadas = set()
+        pessoas_afetadas = set()
+        for p, s in adicionar:
+            if p not in self.pessoas_por_sessao[s]:
+                self._adicionar_par(p, s)
+            sessoes_afetadas.add(s)
+            pessoas_afetadas.add(p)
+        for p, s in remover:
+            if p in self.pessoas_por_sessao[s]:
+                self.pessoas_por_sessao[s].remove(p)
+                self.x[p][s].upBound = 0
+            sessoes_afetadas.add(s)
+            pessoas_afetadas.add(p)
+        for s, capacidade in capacidades.items():
+            self.capacidades[s] = int(capacidade)
+            self.problema.constraints[f"Capacidade_{self.posicao_sessao[s]}"][self.y[s]] = -int(capacidade)
+            sessoes_afetadas.add(s)
+        for s in remover_sessoes:
+            self.sessoes_removidas.add(s)
+            self.y[s].upBound = 0
+            sessoes_afetadas.add(s)
+
+        # Quem estava numa sessão afetada também precisa poder mudar de lugar
+        for s in sessoes_afetadas:
+            pessoas_afetadas.update(self.alocacoes.get(s, []))
+        return sessoes_afetadas, pessoas_afetadas
+
+    def _validar(self, pares, sessoes, capacidades):
+        sessoes_desconhecidas = sorted({s for _, s in pares if s not in self.posicao_sessao} |
+                                       {s for s in sessoes if s not in self.posicao_sessao})
+        if sessoes_desconhecidas:
+            raise ValueError(f"Sessão(ões) desconhecida(s): {', '.join(map(str, sessoes_desconhecidas))}")
+        pessoas_desconhecidas = sorted({p for p, _ in pares if p not in self.posicao_pessoa})
+        if pessoas_desconhecidas:
+            raise ValueError(f"Pessoa(s) desconhecida(s): {', '.join(map(str, pessoas_desconhecidas))}")
+        invalidas = sorted(s for s, capacidade in capacidades.items() if int(capacidade) < 1)
+        if invalidas:
+            raise ValueError(f"A capacidade deve ser pelo menos 1 (sessões: {', '.join(map(str, invalidas))})")
+
+    def _adicionar_par(self, p, s):
+        self.pessoas_por_sessao[s].append(p)
+        if s in self.x[p]:
+            # O par já existiu e foi removido: basta religar a variável
+            self.x[p][s].upBound = 1
+            return
+
+        i, j = self.posicao_sessao[s], self.posicao_pessoa[p]
+        variavel = pulp.LpVariable(f"Alocacao_{j}_{i}", cat=pulp.LpBinary)
+        self.x[p][s] = variavel
+        self.problema.constraints[f"Capacidade_{i}"][variavel] = 1
+        self.problema.constraints[f"AlocacaoMinima_{i}"][variavel] = 1
+        self.problema.constraints[f"AlocacaoUnica_{j}"][variavel] = 1
+
+    # --- resolução ---
+
+    def reotimizar(self, delta, tempo_limite_segundos=TEMPO_LIMITE_REOTIMIZACAO, fixar_nao_afetados=True):
+        """Aplica o delta, resolve a partir da solução anterior e devolve o cronograma atualizado."""
+        with self.trava:
+            inicio = time.perf_counter()
+            sessoes_afetadas, pessoas_afetadas = self.aplicar_delta(delta)
+            solucao = self._ajustar_solucao()
+            definir_valores_iniciais(solucao, self.x, self.y, self.nao_alocado)
+
+            fixadas = []
+            if fixar_nao_afetados:
+                for s, integrantes in solucao["alocacoes"].items():
+                    if s in sessoes_afetadas:
+                        continue
+                    for p in integrantes:
+                        if p not in pessoas_afetadas:
+                            self.x[p][s].lowBound = 1
+                            fixadas.append(self.x[p][s])
+
+            try:
+                with otimizacao_em_andamento():
+                    resumo_solver = executar_solver(self.problema, tempo_limite_segundos, self.config_solver, warm_start=True)
+            finally:
+                for variavel in fixadas:
+                    variavel.lowBound = 0
+
+            status_resolucao = self.problema.status
+            registrar_evento("reotimizacao_concluida", logging.DEBUG, sessoes_afetadas=len(sessoes_afetadas),
+                             alocacoes_fixas=len(fixadas), status=pulp.LpStatus[status_resolucao])
+
+            alocacoes, nao_alocados = extrair_solucao(
+                self.sessoes, self.pessoas, self.pessoas_por_sessao, self.x, self.y, self.nao_alocado
+            )
+            # A solução anterior ajustada é viável: nunca devolve algo pior que ela
+            if self._objetivo(alocacoes, nao_alocados) > self._objetivo(solucao["alocacoes"], solucao["nao_alocados"]):
+                registrar_evento("reotimizacao_sem_melhora", logging.DEBUG)
+                alocacoes, nao_alocados = solucao["alocacoes"], solucao["nao_alocados"]
+
+            self.alocacoes = {s: sorted(integrantes) for s, integrantes in alocacoes.items()}
+            self.nao_alocados = sorted(nao_alocados)
+
+            resultado = self.resultado()
+            resultado["reotimizacao"] = {
+                "sessoes_afetadas": len(sessoes_afetadas),
+                "pessoas_afetadas": len(pessoas_afetadas),
+                "alocacoes_fixadas": len(fixadas),
+                "backend_solver": resumo_solver["backend"],
+                "status_solver": pulp.LpStatus[status_resolucao],
+                "gap_relativo": resumo_solver["gap_relativo"],
+                "limite_tempo_atingido": resumo_solver["limite_tempo_atingido"],
+                "tempo_segundos": round(time.perf_counter() - inicio, 4),
+            }
+            return resultado
+
+    def _ajustar_solucao(self):
+        """Solução atual tornada viável após o delta: quem perdeu a vaga fica não alocado."""
+        alocacoes = {}
+        nao_alocados = set(self.nao_alocados)
+        for s, integrantes in self.alocacoes.items():
+            disponiveis = set(self.pessoas_por_sessao[s]) if s not in self.sessoes_removidas else set()
+            validos = [p for p in integrantes if p in disponiveis][:self.capacidades[s]]
+            nao_alocados.update(p for p in integrantes if p not in validos)
+            if validos:
+                alocacoes[s] = validos
+        return {"alocacoes": alocacoes, "nao_alocados": [p for p in self.pessoas if p in nao_alocados]}
+
+    def _objetivo(self, alocacoes, nao_alocados):
+        return len(alocacoes) + (len(self.pessoas) + 1) * len(nao_alocados)
+
+    def resultado(self):
+        sessoes_agendadas = formatar_sessoes_agendadas(self.sessoes, self.alocacoes, self.tabela)
+        return {
+            "total_sessoes_utilizadas": len(sessoes_agendadas),
+            "sessoes_agendadas": sessoes_agendadas,
+            "pessoas_nao_alocadas": list(self.nao_alocados),
+        }
+
+
+class RepositorioCronogramas:
+    """Cronogramas mantidos em memória por id, descartando os menos usados além do limite."""
+
+    def __init__(self, max_cronogramas=None):
+        self.max_cronogramas = MAX_CRONOGRAMAS if max_cronogramas is None else max_cronogramas
+        self._modelos = OrderedDict()
+        self._trava = threading.Lock()
+
+    def guardar(self, modelo):
+        id_cronograma = uuid.uuid4().hex
+        with self._trava:
+            self._modelos[id_cronograma] = modelo
+            while len(self._modelos) > self.max_cronogramas:
+                self._modelos.popitem(last=False)
+        return id_cronograma
+
+    def obter(self, id_cronograma):
+        with self._trava:
+            modelo = self._modelos.get(id_cronograma)
+            if modelo is not None:
+                self._modelos.move_to_end(id_cronograma)
+            return modelo
+
+    def remover(self, id_cronograma):
+        with self._trava:
+            return self._modelos.pop(id_cronograma, None) is not None
+
+
+repositorio_padrao = RepositorioCronogramas()
+
+
+def criar_cronograma(parametros, conteudo_arquivo, repositorio=None):
+    """Executa o pipeline completo e guarda o modelo para reotimizações; devolve o resultado com o id."""
+    if repositorio is None:
+        repositorio = repositorio_padrao
+    tabela, df_matriz, resultado = executar_pipeline_com_entradas(parametros, conteudo_arquivo)
+    modelo = ModeloIncremental(tabela, df_matriz, resultado, parametros.get("solver"))
+    return dict(resultado, id_cronograma=repositorio.guardar(modelo))
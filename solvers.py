@@ -0,0 +1,178 @@
+import contextlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+import pulp
+
+from instrumentacao import logger
+
+# Backends de solver disponíveis: "cbc" (executável do PuLP) e "highs" (highspy, no próprio processo)
+SOLVERS = ("cbc", "highs")
+SOLVER_PADRAO = os.environ.get("CRONOGRAMA_SOLVER", "cbc")
+# Threads por execução do solver; 0 divide os núcleos entre as otimizações simultâneas (ver `com_threads`)
+THREADS_SOLVER = int(os.environ.get("CRONOGRAMA_THREADS_SOLVER", 0))
+# Gap relativo aceito para parar antes de provar o ótimo; vazio usa o padrão de cada solver
+GAP_RELATIVO = float(os.environ["CRONOGRAMA_GAP_RELATIVO"]) if os.environ.get("CRONOGRAMA_GAP_RELATIVO") else None
+# Arquivo em que o PuLP entrega o modelo ao CBC: "mps" (mais rápido de escrever e ler) ou "lp"
+FORMATO_CBC = os.environ.get("CRONOGRAMA_FORMATO_CBC", "mps")
+FORMATOS_CBC = ("mps", "lp")
+
+# Otimizações que dividem os núcleos com as deste processo: os processos que otimizam ao
+# mesmo tempo (tarefas, cenários de lote) e as requisições em andamento neste processo
+_processos_simultaneos = 1
+_otimizacoes_em_andamento = 0
+_trava = threading.Lock()
+
+
+def configurar_solver(nome=None, threads=None, gap_relativo=None, formato_cbc=None):
+    """
+    Configuração (um dicionário serializável, que pode ir para outros processos) do
+    solver. Campos não informados vêm das variáveis de ambiente CRONOGRAMA_*.
+    """
+    nome = (nome or SOLVER_PADRAO).lower()
+    if nome not in SOLVERS:
+        raise ValueError(f"Solver desconhecido: '{nome}'. Use um de {SOLVERS}.")
+    formato_cbc = formato_cbc or FORMATO_CBC
+    if formato_cbc not in FORMATOS_CBC:
+        raise ValueError(f"Formato de arquivo do CBC desconhecido: '{formato_cbc}'. Use um de {FORMATOS_CBC}.")
+    threads = THREADS_SOLVER if threads is None else threads
+    if threads < 0:
+        raise ValueError("O número de threads do solver não pode ser negativo.")
+    gap_relativo = GAP_RELATIVO if gap_relativo is None else gap_relativo
+    if gap_relativo is not None and not 0 <= gap_relativo < 1:
+        raise ValueError("O gap relativo do solver deve estar entre 0 e 1.")
+    return {"nome": nome, "threads": threads, "gap_relativo": gap_relativo, "formato_cbc": formato_cbc}
+
+
+def definir_processos_simultaneos(quantidade):
+    """Número de processos, este incluído, que podem otimizar ao mesmo tempo (tarefas ou cenários de lote)."""
+    global _processos_simultaneos
+    _processos_simultaneos = max(1, quantidade)
+
+
+@contextlib.contextmanager
+def otimizacao_em_andamento():
+    """Marca uma otimização em andamento neste processo; as simultâneas dividem os núcleos."""
+    global _otimizacoes_em_andamento
+    with _trava:
+        _otimizacoes_em_andamento += 1
+    try:
+        yield
+    finally:
+        with _trava:
+            _otimizacoes_em_andamento -= 1
+
+
+def com_threads(config, execucoes_simultaneas=1):
+    """
+    Preenche o número automático de threads: os núcleos divididos entre as execuções
+    simultâneas desta otimização, as otimizações em andamento neste processo e os
+    processos que otimizam ao mesmo tempo.
+    """
+    if config["threads"]:
+        return config
+    simultaneas = max(1, execucoes_simultaneas) * max(1, _otimizacoes_em_andamento) * _processos_simultaneos
+    return dict(config, threads=max(1, (os.cpu_count() or 1) // simultaneas))
+
+
+def executar_solver(problema, tempo_limite_segundos, config=None, warm_start=False):
+    """
+    Resolve o problema com o backend de `config` (padrão: `configurar_solver()`) e
+    devolve o resumo da execução no mesmo formato para todos os backends: status,
+    objetivo, limite inferior, gap relativo ao objetivo, se o limite de tempo foi
+    atingido, tempo de parede e nome do backend.
+
+    Com `warm_start`, os valores iniciais das variáveis são a solução de partida.
+    """
+    config = com_threads(config or configurar_solver())
+    inicio = time.perf_counter()
+    if config["nome"] == "highs":
+        limite, limite_tempo_atingido = _executar_highs(problema, tempo_limite_segundos, config, warm_start)
+    else:
+        limite, limite_tempo_atingido = _executar_cbc(problema, tempo_limite_segundos, config, warm_start)
+    tempo = time.perf_counter() - inicio
+
+    objetivo = pulp.value(problema.objective)
+    if problema.sol_status == pulp.LpSolutionOptimal:
+        gap = 0.0
+    elif objetivo is not None and limite is not None:
+        gap = max(0.0, (objetivo - limite) / max(abs(objetivo), 1e-9))
+    else:
+        gap = None
+
+    return {
+        "status": pulp.LpStatus[problema.status],
+        "objetivo": objetivo,
+        "limite_inferior": limite,
+        "gap_relativo": round(gap, 6) if gap is not None else None,
+        "limite_tempo_atingido": limite_tempo_atingido,
+        "tempo_segundos": round(tempo, 4),
+        "backend": config["nome"],
+    }
+
+
+def _executar_cbc(problema, tempo_limite_segundos, config, warm_start):
+    """
+    CBC do PuLP. O log vai para um arquivo temporário, de onde saem o limite inferior
+    e o motivo da parada; o texto completo é repassado ao logger em nível DEBUG.
+    """
+    descritor, caminho_log = tempfile.mkstemp(suffix=".log")
+    os.close(descritor)
+    try:
+        solver = pulp.PULP_CBC_CMD(timeLimit=tempo_limite_segundos, warmStart=warm_start, threads=config["threads"],
+                                   gapRel=config["gap_relativo"], msg=False, logPath=caminho_log)
+        problema.solve(solver, use_mps=config["formato_cbc"] == "mps")
+        with open(caminho_log, encoding="utf-8", errors="replace") as arquivo:
+            log_solver = arquivo.read()
+    finally:
+        os.unlink(caminho_log)
+    logger.debug("log_solver", extra={"campos": {"solver": "cbc", "log": log_solver}})
+
+    encontrado = re.search(r"Lower bound:\s+(\S+)", log_solver)
+    limite = float(encontrado.group(1)) if encontrado else None
+    return limite, "Stopped on time" in log_solver
+
+
+def _executar_highs(problema, tempo_limite_segundos, config, warm_start):
+    """HiGHS pelo highspy, no próprio processo: sem arquivos intermediários nem executável externo."""
+    import highspy
+
+    solver = _HiGHSComInicio(warm_start=warm_start, timeLimit=tempo_limite_segundos, threads=config["threads"],
+                             gapRel=config["gap_relativo"], msg=False)
+    problema.solve(solver)
+    modelo = problema.solverModel
+    info = modelo.getInfo()
+    logger.debug("log_solver", extra={"campos": {
+        "solver": "highs", "status": modelo.modelStatusToString(modelo.getModelStatus()),
+        "nos": info.mip_node_count, "limite_inferior": info.mip_dual_bound,
+    }})
+    limite_tempo_atingido = modelo.getModelStatus() == highspy.HighsModelStatus.kTimeLimit
+    limite = info.mip_dual_bound if abs(info.mip_dual_bound) != highspy.kHighsInf else None
+    # Libera o modelo do HiGHS (a solução já foi copiada para as variáveis do PuLP)
+    problema.solverModel = None
+    return limite, limite_tempo_atingido
+
+
+class _HiGHSComInicio(pulp.HiGHS):
+    """HiGHS do PuLP que, com `warm_start`, entrega os valores iniciais das variáveis como solução de partida."""
+
+    def __init__(self, warm_start=False, **parametros):
+        super().__init__(**parametros)
+        self.warm_start = warm_start
+
+    def callSolver(self, lp):
+        if self.warm_start:
+            import highspy
+
+            variaveis = lp.variables()
+            valores = [0.0] * len(variaveis)
+            for variavel in variaveis:
+                valores[variavel.index] = variavel.varValue or 0.0
+            solucao = highspy.HighsSolution()
+            solucao.col_value = valores
+            solucao.value_valid = True
+            lp.solverModel.setSolution(solucao)
+        super().callSolver(lp)
@@ -0,0 +1,250 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+
+from instrumentacao import publicar
+from pipeline import ErroPipeline
+
+# --- Configuração (variáveis de ambiente) ---
+# Número máximo de tarefas executando ao mesmo tempo (um processo por tarefa)
+MAX_CONCORRENCIA = int(os.environ.get("CRONOGRAMA_MAX_CONCORRENCIA", max(1, (os.cpu_count() or 2) // 2)))
+# Número máximo de tarefas aguardando na fila antes de recusar novas submissões
+MAX_FILA = int(os.environ.get("CRONOGRAMA_MAX_FILA", 20))
+# Tempo (segundos) que tarefas finalizadas e seus resultados ficam disponíveis
+RETENCAO_SEGUNDOS = float(os.environ.get("CRONOGRAMA_RETENCAO_SEGUNDOS", 3600))
+
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+CANCELADA = "cancelada"
+ESTADOS_FINAIS = (CONCLUIDA, FALHOU, CANCELADA)
+
+
+class FilaCheiaError(Exception):
+    """A fila de tarefas atingiu MAX_FILA."""
+
+
+class Tarefa:
+    """Estado de uma execução do pipeline submetida ao gerenciador."""
+
+    def __init__(self, funcao, args, ao_concluir=None):
+        self.id = uuid.uuid4().hex
+        self.funcao = funcao
+        self.args = args
+        self.ao_concluir = ao_concluir
+        self.estado = NA_FILA
+        self.criada_em = time.time()
+        self.iniciada_em = None
+        self.finalizada_em = None
+        self.progresso = []
+        self.resultado = None
+        self.erro = None
+        self.processo = None
+
+    def registrar_progresso(self, etapa):
+        self.progresso.append({"etapa": etapa, "instante": time.time()})
+
+    def resumo(self):
+        return {
+            "id_tarefa": self.id,
+            "estado": self.estado,
+            "criada_em": self.criada_em,
+            "iniciada_em": self.iniciada_em,
+            "finalizada_em": self.finalizada_em,
+            "etapa_atual": self.progresso[-1]["etapa"] if self.progresso else None,
+            "erro": self.erro,
+        }
+
+
+class GerenciadorTarefas:
+    """
+    Executa tarefas longas fora do event loop.
+
+    Cada tarefa roda em um processo próprio (no máximo `max_concorrencia` ao mesmo
+    tempo), iniciado em uma nova sessão para que o cancelamento mate também o
+    subprocesso do CBC. Submissões além de `max_fila` tarefas aguardando são recusadas.
+    """
+
+    def __init__(self, max_concorrencia=MAX_CONCORRENCIA, max_fila=MAX_FILA, retencao_segundos=RETENCAO_SEGUNDOS):
+        self.max_concorrencia = max_concorrencia
+        self.retencao_segundos = retencao_segundos
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._tarefas = {}
+        self._trava = threading.Lock()
+        self._contexto = multiprocessing.get_context("spawn")
+        self._trabalhadores = []
+
+    def submeter(self, funcao, *args, ao_concluir=None):
+        """
+        Enfileira `funcao(*args, progresso=...)` e devolve a tarefa criada.
+        `ao_concluir`, se informado, recebe o retorno da função neste processo e
+        devolve o resultado a guardar na tarefa.
+        """
+        self._iniciar_trabalhadores()
+        self._remover_expiradas()
+
+        tarefa = Tarefa(funcao, args, ao_concluir)
+        with self._trava:
+            self._tarefas[tarefa.id] = tarefa
+        try:
+            self._fila.put_nowait(tarefa)
+        except queue.Full:
+            with self._trava:
+                del self._tarefas[tarefa.id]
+            raise FilaCheiaError("Fila de tarefas cheia. Tente novamente mais tarde.")
+        return tarefa
+
+    def obter(self, id_tarefa):
+        self._remover_expiradas()
+        with self._trava:
+            return self._tarefas.get(id_tarefa)
+
+    def cancelar(self, id_tarefa):
+        """Cancela a tarefa. Se já estiver executando, mata o processo e seus filhos (CBC)."""
+        tarefa = self.obter(id_tarefa)
+        if tarefa is None:
+            return tarefa
+
+        # Sob a trava: o trabalhador não pode iniciar nem concluir a tarefa no meio do cancelamento
+        with self._trava:
+            if tarefa.estado in ESTADOS_FINAIS:
+                return tarefa
+            processo = tarefa.processo
+            tarefa.estado = CANCELADA
+            tarefa.finalizada_em = time.time()
+        if processo is not None:
+            _matar_grupo(processo)
+        return tarefa
+
+    def encerrar(self):
+        """Cancela todas as tarefas pendentes e em execução (desligamento da API)."""
+        with self._trava:
+            ids = list(self._tarefas)
+        for id_tarefa in ids:
+            self.cancelar(id_tarefa)
+
+    # --- Funcionamento interno ---
+
+    def _iniciar_trabalhadores(self):
+        with self._trava:
+            while len(self._trabalhadores) < self.max_concorrencia:
+                trabalhador = threading.Thread(target=self._laco_trabalhador, daemon=True)
+                trabalhador.start()
+                self._trabalhadores.append(trabalhador)
+
+    def _laco_trabalhador(self):
+        while True:
+            tarefa = self._fila.get()
+            try:
+                # Verificação e mudança de estado juntas, sob a trava (um cancelamento pode chegar agora)
+                with self._trava:
+                    iniciar = tarefa.estado == NA_FILA
+                    if iniciar:
+                        tarefa.estado = EXECUTANDO
+                        tarefa.iniciada_em = time.time()
+                if iniciar:
+                    self._executar(tarefa)
+            except Exception as e:
+                self._finalizar(tarefa, FALHOU, erro={"status_code": 500, "detail": f"Não foi possível executar a tarefa: {e}"})
+            finally:
+                self._fila.task_done()
+
+    def _executar(self, tarefa):
+        mensagens = self._contexto.Queue()
+        # Não daemônico: o otimizador abre processos próprios para os componentes, o que
+        # processos daemônicos não podem fazer. No desligamento, `encerrar` mata o grupo.
+        processo = self._contexto.Process(
+            target=_executar_no_processo,
+            args=(mensagens, tarefa.funcao, tarefa.args),
+        )
+        processo.start()
+        with self._trava:
+            tarefa.processo = processo
+            # Cancelada antes de o processo existir: `cancelar` não tinha o que matar
+            cancelada = tarefa.estado == CANCELADA
+        if cancelada:
+            _matar_grupo(processo)
+
+        while True:
+            try:
+                tipo, conteudo = mensagens.get(timeout=0.5)
+            except queue.Empty:
+                if processo.is_alive():
+                    continue
+                # O processo pode ter deixado a última mensagem logo antes de terminar
+                try:
+                    tipo, conteudo = mensagens.get(timeout=0.5)
+                except queue.Empty:
+                    tipo, conteudo = "erro", {"status_code": 500, "detail": "O processo da tarefa terminou inesperadamente."}
+
+            if tipo == "progresso":
+                tarefa.registrar_progresso(conteudo)
+                continue
+            if tipo == "medicoes":
+                publicar(conteudo)
+                continue
+
+            if tipo == "resultado":
+                if tarefa.estado != CANCELADA:
+                    resultado = tarefa.ao_concluir(conteudo) if tarefa.ao_concluir else conteudo
+                    self._finalizar(tarefa, CONCLUIDA, resultado=resultado)
+            else:
+                self._finalizar(tarefa, FALHOU, erro=conteudo)
+            break
+
+        processo.join(timeout=5)
+        tarefa.processo = None
+
+    def _finalizar(self, tarefa, estado, resultado=None, erro=None):
+        """Estado final da tarefa, salvo se ela já foi cancelada (verificação sob a trava)."""
+        with self._trava:
+            if tarefa.estado == CANCELADA:
+                return
+            tarefa.resultado = resultado
+            tarefa.erro = erro
+            tarefa.estado = estado
+            tarefa.finalizada_em = time.time()
+
+    def _remover_expiradas(self):
+        limite = time.time() - self.retencao_segundos
+        with self._trava:
+            expiradas = [
+                id_tarefa for id_tarefa, tarefa in self._tarefas.items()
+                if tarefa.estado in ESTADOS_FINAIS and tarefa.finalizada_em < limite
+            ]
+            for id_tarefa in expiradas:
+                del self._tarefas[id_tarefa]
+
+
+def _executar_no_processo(mensagens, funcao, args):
+    """Ponto de entrada do processo da tarefa."""
+    # Nova sessão: o processo vira líder do grupo e o CBC herda esse grupo
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    try:
+        resultado = funcao(*args, progresso=lambda etapa: mensagens.put(("progresso", etapa)))
+        mensagens.put(("resultado", resultado))
+    except ErroPipeline as e:
+        if e.medicoes:
+            mensagens.put(("medicoes", e.medicoes))
+        mensagens.put(("erro", {"status_code": e.status_code, "detail": e.detail}))
+    except Exception as e:
+        mensagens.put(("erro", {"status_code": 500, "detail": f"Ocorreu um erro interno no servidor: {str(e)}"}))
+
+
+def _matar_grupo(processo):
+    """Mata o processo da tarefa e todos os seus filhos (ex.: o executável do CBC)."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(processo.pid, signal.SIGKILL)
+            return
+    except (ProcessLookupError, PermissionError):
+        # O processo ainda não criou a própria sessão (ou já terminou)
+        pass
+    processo.kill()
@@ -0,0 +1,88 @@
+"""
+Regressão: uploads validados antes da leitura completa devem chegar inteiros aos
+processos das tarefas e dos lotes (a validação não pode deixar o arquivo no meio).
+"""
+import datetime
+import io
+import json
+import os
+import sys
+import time
+
+import openpyxl
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+DADOS = {
+    "data_inicio_str": "2024-03-04", "data_fim_str": "2024-03-08", "dias_da_semana_json": "[0,1,2,3,4]",
+    "horarios_inicio_list_str": "08:00,14:00", "duracao_sessao_horas": "2", "capacidade_padrao": "5",
+    "equipes_str": "Equipe1,Equipe2",
+}
+
+
+def _planilha(marcador):
+    """Workbook no formato das abas das equipes; `marcador` torna o arquivo (e o hash) único."""
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for equipe in ("Equipe1", "Equipe2"):
+        aba = workbook.create_sheet(equipe)
+        aba.append([f"Disponibilidade {equipe} {marcador}"])
+        aba.append(["Data", "Turma", "hora ini", "hora fim", None, "Nome", "Turma"])
+        for i in range(8):
+            aba.append([
+                datetime.datetime(2024, 3, 4 + i % 5), f"T{i}", datetime.time(8 if i % 2 else 14), datetime.time(18),
+                None, f"Pessoa {equipe} {i}", f"T{i}",
+            ])
+    saida = io.BytesIO()
+    workbook.save(saida)
+    return saida.getvalue()
+
+
+def test_tarefa_com_planilha_nova():
+    with TestClient(main.app) as cliente:
+        resposta = cliente.post(
+            "/api/tarefas/gerar-cronograma", data=DADOS, files={"arquivo": ("a.xlsx", _planilha(time.time_ns()))}
+        )
+        assert resposta.status_code == 202
+        id_tarefa = resposta.json()["id_tarefa"]
+
+        limite = time.time() + 120
+        while time.time() < limite:
+            resumo = cliente.get(f"/api/tarefas/{id_tarefa}").json()
+            if resumo["estado"] in main.ESTADOS_FINAIS:
+                break
+            time.sleep(0.2)
+
+        resultado = cliente.get(f"/api/tarefas/{id_tarefa}/resultado")
+        assert resultado.status_code == 200, resultado.text
+        assert resultado.json()["total_sessoes_utilizadas"] > 0
+
+
+def test_lote_com_planilha_nova():
+    cenarios = [dict(DADOS, nome="padrao"), dict(DADOS, nome="capacidade_3", capacidade_padrao=3)]
+    with TestClient(main.app) as cliente:
+        resposta = cliente.post(
+            "/api/lotes/gerar-cronograma", data={"cenarios_json": json.dumps(cenarios)},
+            files={"arquivo": ("a.xlsx", _planilha(time.time_ns()))},
+        )
+        assert resposta.status_code == 200
+        linhas = [json.loads(linha) for linha in resposta.text.splitlines()]
+        assert sorted(linha["nome"] for linha in linhas) == ["capacidade_3", "padrao"]
+        assert all(linha["status"] == 200 for linha in linhas), linhas
+
+
+def test_lote_com_cenario_invalido():
+    cenarios = [dict(DADOS, nome="padrao"), dict(DADOS, nome="sem_aba", equipes_str="Equipe1,Equipe3")]
+    with TestClient(main.app) as cliente:
+        resposta = cliente.post(
+            "/api/lotes/gerar-cronograma", data={"cenarios_json": json.dumps(cenarios)},
+            files={"arquivo": ("a.xlsx", _planilha(time.time_ns()))},
+        )
+        assert resposta.status_code == 200
+        linhas = {linha["nome"]: linha for linha in map(json.loads, resposta.text.splitlines())}
+        assert linhas["padrao"]["status"] == 200, linhas
+        assert linhas["sem_aba"]["status"] == 400
+        assert "Equipe3" in linhas["sem_aba"]["detail"]
@@ -0,0 +1,72 @@
+import os
+
+from starlette.formparsers import MultiPartParser
+
+# --- Configuração (variáveis de ambiente) ---
+# Tamanho máximo do arquivo Excel enviado, em MB
+TAMANHO_MAX_UPLOAD_MB = float(os.environ.get("CRONOGRAMA_TAMANHO_MAX_UPLOAD_MB", 20))
+# Até este tamanho (MB) o arquivo recebido fica em memória; acima, vai para um arquivo temporário
+UPLOAD_EM_MEMORIA_MB = float(os.environ.get("CRONOGRAMA_UPLOAD_EM_MEMORIA_MB", 2))
+# Espaço além do arquivo aceito no corpo da requisição (demais campos do formulário e delimitadores)
+FOLGA_FORMULARIO_BYTES = 1024 * 1024
+
+# O Starlette grava cada arquivo do formulário num SpooledTemporaryFile deste tamanho
+MultiPartParser.max_file_size = int(UPLOAD_EM_MEMORIA_MB * 1024 * 1024)
+
+
+class UploadGrandeError(Exception):
+    """O arquivo ou a requisição passou de TAMANHO_MAX_UPLOAD_MB."""
+
+
+def tamanho_maximo_bytes():
+    return int(TAMANHO_MAX_UPLOAD_MB * 1024 * 1024)
+
+
+def tamanho_maximo_requisicao_bytes():
+    return tamanho_maximo_bytes() + FOLGA_FORMULARIO_BYTES
+
+
+def verificar_tamanho_requisicao(content_length):
+    """
+    Recusa, pelo cabeçalho Content-Length, uma requisição que não pode caber no limite,
+    antes de o corpo ser recebido. Sem o cabeçalho, o limite vale na contagem dos bytes recebidos.
+    """
+    if content_length is None:
+        return
+    try:
+        tamanho = int(content_length)
+    except ValueError:
+        return
+    if tamanho > tamanho_maximo_requisicao_bytes():
+        raise UploadGrandeError(_mensagem_requisicao(tamanho))
+
+
+def verificar_bytes_recebidos(recebidos):
+    """Recusa o corpo assim que os bytes recebidos passam do limite (requisições sem Content-Length)."""
+    if recebidos > tamanho_maximo_requisicao_bytes():
+        raise UploadGrandeError(_mensagem_requisicao(recebidos, parcial=True))
+
+
+def receber_upload(arquivo):
+    """
+    Devolve o arquivo em que o Starlette já gravou o upload (memória até
+    UPLOAD_EM_MEMORIA_MB, disco acima), posicionado no início, sem copiá-lo.
+    Arquivos acima do limite geram UploadGrandeError. Quem chama o fecha.
+    """
+    fonte = arquivo.file
+    tamanho = arquivo.size
+    if tamanho is None:
+        tamanho = fonte.seek(0, os.SEEK_END)
+    if tamanho > tamanho_maximo_bytes():
+        raise UploadGrandeError(_mensagem_limite(tamanho))
+    fonte.seek(0)
+    return fonte
+
+
+def _mensagem_limite(tamanho):
+    return f"Arquivo de {tamanho / 1024 / 1024:.2f} MB acima do limite de {TAMANHO_MAX_UPLOAD_MB:g} MB."
+
+
+def _mensagem_requisicao(tamanho, parcial=False):
+    tamanho_mb = f"{'mais de ' if parcial else ''}{tamanho / 1024 / 1024:.2f} MB"
+    return f"Requisição de {tamanho_mb} acima do limite de {TAMANHO_MAX_UPLOAD_MB:g} MB para o arquivo."